@@ -14,13 +14,22 @@ module cpu_tb_gui;
     reg         reset_n;
     reg  [10:0] instruction;
 
-    // Instruction Memory (256 slots)
-    reg [10:0] prog_mem [0:255]; 
+    // Instruction Stream (see open_program / fetch_instruction)
+    // Words are read from the program file one at a time while the
+    // CPU runs, so program length is bounded only by the file.
+    integer prog_fd;
+    integer prog_left;      // Image words not read yet (-1: hex file)
+    reg [8*1024:1] prog_line;
     integer pc;
 
     // Helper for printing opcode strings
     reg [8*3:1] op_str; 
 
+    // Injection Schedule (see load_injections)
+    localparam INJ_DEPTH = 4096;
+    reg [39:0] inj_mem [0:INJ_DEPTH-1];
+    integer    inj_ptr;
+
     // ===============================================================
     // 2. DUT INSTANTIATION
     // ===============================================================
@@ -42,66 +51,261 @@ module cpu_tb_gui;
     end
 
     // ===============================================================
-    // WAVEFORM DUMPING (For GTKWave)
+    // WAVEFORM DUMPING (For GTKWave) - off unless requested
     // ===============================================================
+    //   +dump                 enable (any +dump_* option enables too)
+    //   +dump_file=<path>     output file       (default simulation.vcd)
+    //   +dump_scope=<name>    tb | cpu | decoder | alu | ram  (default tb)
+    //   +dump_depth=<n>       levels below the scope (default 0 = all)
+    //   +dump_start=<ns>      start recording at this time
+    //   +dump_stop=<ns>       stop recording at this time
+    reg [8*256:1] dump_file;
+    reg [8*16:1]  dump_scope;
+    integer       dump_depth, dump_start, dump_stop;
+
     initial begin
-        $dumpfile("simulation.vcd");
-        $dumpvars(0, cpu_tb_gui);
+        if ($test$plusargs("dump")) begin
+            if (!$value$plusargs("dump_file=%s", dump_file))   dump_file  = "simulation.vcd";
+            if (!$value$plusargs("dump_scope=%s", dump_scope)) dump_scope = "tb";
+            if (!$value$plusargs("dump_depth=%d", dump_depth)) dump_depth = 0;
+            if (!$value$plusargs("dump_start=%d", dump_start)) dump_start = 0;
+            if (!$value$plusargs("dump_stop=%d", dump_stop))   dump_stop  = -1;
+
+            $dumpfile(dump_file);
+            case (dump_scope)
+                "cpu":     $dumpvars(dump_depth, u_cpu);
+                "decoder": $dumpvars(dump_depth, u_cpu.u_decoder);
+                "alu":     $dumpvars(dump_depth, u_cpu.u_alu);
+                "ram":     $dumpvars(dump_depth, u_cpu.u_ram);
+                default:   $dumpvars(dump_depth, cpu_tb_gui);
+            endcase
+
+            // Time window
+            if (dump_start > 0) begin
+                $dumpoff;
+                #(dump_start) $dumpon;
+            end
+            if (dump_stop > dump_start) begin
+                #(dump_stop - dump_start) $dumpoff;
+            end
+        end
     end
     
     // ===============================================================
     // 4. MAIN EXECUTION LOOP
     // ===============================================================
+    // Default: run program.hex once and $finish
+    // (+image=<program.bin> streams a packed image instead).
+    // With +server: stay resident and run one job per stdin command
+    //   RUN <program.hex> <injections.hex>   (absolute paths, no spaces)
+    //   RUNBIN <program.bin> <injections.hex>
+    //   QUIT                                 (or EOF on stdin)
+    // Each job resets the CPU and ends with [DONE] + flush.
+    localparam STDIN = 32'h8000_0000;
+    // stdout is a block-buffered pipe in server mode: flush every
+    // FLUSH_EVERY instructions so the GUI sees events while a job
+    // runs (SimSession.stream), not only at [DONE].
+    localparam FLUSH_EVERY = 64;
+
+    reg [8*256:1] prog_file;
+    reg [8*256:1] inj_file;
+    reg [8*8:1]   cmd;
+    integer       r_cmd;
+
     initial begin
-        // 1. Load the Hex File created by the GUI
-        // The GUI MUST save "program.hex" before running this simulation
-        $readmemh("program.hex", prog_mem);
-
-        // 2. Initialize
-        reset_n = 0;
-        instruction = 0;
-
-        // 3. Reset Sequence
-        repeat(2) @(posedge clk);
-        reset_n = 1;
-        @(negedge clk); 
-
-        // 4. Run Loop
-        // We scan until we hit an undefined instruction (x) or limit
-        for (pc = 0; pc < 256; pc = pc + 1) begin
-            
-            instruction = prog_mem[pc];
+        prog_file = "program.hex";
+        inj_file  = "injections.hex";
+        prog_fd   = 0;
+
+        if ($test$plusargs("server")) begin
+            reset_n = 0;
+            instruction = 0;
+            forever begin
+                r_cmd = $fscanf(STDIN, "%s", cmd);
+                if (r_cmd != 1 || (cmd != "RUN" && cmd != "RUNBIN")) $finish;
+                r_cmd = $fscanf(STDIN, "%s %s", prog_file, inj_file);
+
+                open_program(cmd == "RUNBIN");
+                load_injections();
 
-            // STOP Condition: Undefined instruction implies end of program
-            if (instruction === 11'bx) begin
-                $display("[DONE]"); // Signal to GUI that we finished
-                $finish;
+                reset_cpu();
+                run_program();
+                $fflush;
             end
+        end else begin
+            // 1. Open the Hex File created by the GUI
+            // The GUI MUST save "program.hex" before running this simulation
+            if ($value$plusargs("image=%s", prog_file))
+                open_program(1);
+            else
+                open_program(0);
+            load_injections();
 
-            // Decode Opcode for logging
-            case (`GET_OPCODE(instruction))
-                `OPC_STO: op_str = "STO";
-                `OPC_ADD: op_str = "ADD";
-                `OPC_SUB: op_str = "SUB";
-                `OPC_AND: op_str = "AND";
-                `OPC_OR:  op_str = "OR ";
-                `OPC_XOR: op_str = "XOR";
-                `OPC_NOT: op_str = "NOT";
-                default:  op_str = "???";
-            endcase
+            // 2. Initialize
+            reset_n = 0;
+            instruction = 0;
 
-            // Log the start of execution (Python reads this to highlight current line)
-            $display("[EXEC] PC:%0d | Op:%s | Dest:%h | Src:%h", 
-                     pc, op_str, `GET_OP1(instruction), `GET_OP2(instruction));
+            // 3. Reset Sequence
+            repeat(2) @(posedge clk);
+            reset_n = 1;
+            @(negedge clk); 
 
-            // Run the hardware cycle
-            run_cycle();
+            // 4. Run Loop
+            run_program();
+            $finish;
         end
-        
-        $display("[DONE]");
-        $finish;
     end
 
+    // ===============================================================
+    // TASK: Load The Injection Schedule (once per run)
+    // ===============================================================
+    // injections.hex is written by save_injections_file() in gui.py:
+    // one entry per line, {pc[31:0], addr[3:0], val[3:0]} as 10 hex
+    // digits, sorted by pc. run_cycle walks it with inj_ptr, so no
+    // file I/O happens per instruction.
+    task load_injections;
+        integer fd, k;
+        begin
+            for (k = 0; k < INJ_DEPTH; k = k + 1) inj_mem[k] = 40'bx;
+            inj_ptr = 0;
+
+            fd = $fopen(inj_file, "r");
+            if (fd) begin
+                $fclose(fd);
+                $readmemh(inj_file, inj_mem);
+            end
+        end
+    endtask
+
+    // ===============================================================
+    // TASK: Open The Program Stream
+    // ===============================================================
+    // Hex files ($readmemh style) are read one line per word; lines
+    // that do not start with a hex word (blank, // comments) are
+    // skipped. Packed images (assembler.write_image) are
+    // "CPUIMAGE" | u32 version | u32 count, then count little-endian
+    // u16 words, read byte-wise with $fgetc (no text parsing).
+    task open_program;
+        input is_image;
+        integer k, b0;
+        reg [8*8:1] magic;
+        begin
+            if (prog_fd) $fclose(prog_fd);
+            prog_left = is_image ? 0 : -1;
+
+            prog_fd = $fopen(prog_file, is_image ? "rb" : "r");
+            if (prog_fd == 0) begin
+                $display("[ERROR] Cannot open program %0s", prog_file);
+            end else if (is_image) begin
+                magic = 0;
+                for (k = 0; k < 8; k = k + 1) begin
+                    b0 = $fgetc(prog_fd);
+                    magic = {magic[8*7:1], b0[7:0]};
+                end
+
+                if (magic != "CPUIMAGE") begin
+                    $display("[ERROR] Not a program image: %0s", prog_file);
+                end else begin
+                    for (k = 0; k < 4; k = k + 1) b0 = $fgetc(prog_fd);  // version
+                    for (k = 0; k < 4; k = k + 1) begin
+                        b0 = $fgetc(prog_fd);
+                        prog_left = prog_left | ((b0 & 8'hFF) << (8 * k));
+                    end
+                end
+            end
+        end
+    endtask
+
+    // ===============================================================
+    // TASK: Read The Next Instruction (x at end of program)
+    // ===============================================================
+    task fetch_instruction;
+        integer b0, b1, r;
+        reg [10:0] word;
+        begin
+            instruction = 11'bx;
+            if (prog_fd == 0) begin
+                // Nothing open: end of program
+            end else if (prog_left >= 0) begin
+                if (prog_left > 0) begin
+                    b0 = $fgetc(prog_fd);
+                    b1 = $fgetc(prog_fd);
+                    prog_left = prog_left - 1;
+                    if (b1 < 0) prog_left = 0;   // Truncated image: stop here
+                    else instruction = {b1[2:0], b0[7:0]};
+                end
+            end else begin
+                r = 0;
+                while (r != 1 && !$feof(prog_fd)) begin
+                    prog_line = 0;
+                    if ($fgets(prog_line, prog_fd) > 0)
+                        r = $sscanf(prog_line, "%h", word);
+                end
+                if (r == 1) instruction = word;
+            end
+        end
+    endtask
+
+    // ===============================================================
+    // TASK: Reset Between Server Jobs
+    // ===============================================================
+    // Ends on a negedge with the FSM in FETCH, the same state the
+    // one-shot reset sequence leaves it in.
+    task reset_cpu;
+        begin
+            instruction = 0;
+            @(negedge clk);
+            reset_n = 0;     // async: FSM -> INIT, RAM + ALU cleared
+            @(negedge clk);
+            reset_n = 1;
+            @(posedge clk);  // INIT -> FETCH
+            @(negedge clk);
+        end
+    endtask
+
+    // ===============================================================
+    // TASK: Run The Program Stream Until Its End
+    // ===============================================================
+    task run_program;
+        reg halted;
+        begin
+            halted = 0;
+            // We stream until we hit the end of the program (x)
+            for (pc = 0; !halted; pc = pc + 1) begin
+                
+                fetch_instruction();
+
+                // STOP Condition: Undefined instruction implies end of program
+                if (instruction === 11'bx) begin
+                    halted = 1;
+                end else begin
+                    // Decode Opcode for logging
+                    case (`GET_OPCODE(instruction))
+                        `OPC_STO: op_str = "STO";
+                        `OPC_ADD: op_str = "ADD";
+                        `OPC_SUB: op_str = "SUB";
+                        `OPC_AND: op_str = "AND";
+                        `OPC_OR:  op_str = "OR ";
+                        `OPC_XOR: op_str = "XOR";
+                        `OPC_NOT: op_str = "NOT";
+                        default:  op_str = "???";
+                    endcase
+
+                    // Log the start of execution (Python reads this to highlight current line)
+                    $display("[EXEC] PC:%0d | Op:%s | Dest:%h | Src:%h", 
+                             pc, op_str, `GET_OP1(instruction), `GET_OP2(instruction));
+
+                    // Run the hardware cycle
+                    run_cycle();
+                end
+            end
+            
+            if (prog_fd) $fclose(prog_fd);
+            prog_fd = 0;
+            $display("[DONE]"); // Signal to GUI that we finished
+        end
+    endtask
+
     // ===============================================================
     // TASK: Run One Instruction & Log Updates
     // ===============================================================
@@ -110,7 +314,7 @@ module cpu_tb_gui;
         reg [3:0] ram_val;
         
         // MOVED DECLARATIONS TO TOP (Fixes Syntax Error)
-        integer file, r, inj_step, inj_addr, inj_val;
+        integer inj_step, inj_addr, inj_val;
 
         begin
             dest = `GET_OP1(instruction);
@@ -127,22 +331,18 @@ module cpu_tb_gui;
             #1;
 
             // --- INJECTION LOGIC ---
-            file = $fopen("injections.txt", "r");
-            if (file) begin
-                while (!$feof(file)) begin
-                    r = $fscanf(file, "%d %h %h\n", inj_step, inj_addr, inj_val);
-                    // If the injection is for the CURRENT step (pc counter), apply it
-                    if (inj_step == pc) begin
-                        // FORCE WRITE to RAM
-                        u_cpu.u_ram.mem[inj_addr] = inj_val;
-                        $display("[INJECT] Step:%0d RAM[%h]=%h", inj_step, inj_addr, inj_val);
-                        // Also update our local view if we injected into the dest addr
-                        if (inj_addr == dest) begin
-                             // Wait small delay for write to settle? Not needed for blocking assignment
-                        end
-                    end
+            // Apply every scheduled entry for the CURRENT step (pc counter)
+            while (inj_ptr < INJ_DEPTH && inj_mem[inj_ptr] !== 40'bx &&
+                   inj_mem[inj_ptr][39:8] <= pc) begin
+                if (inj_mem[inj_ptr][39:8] == pc) begin
+                    inj_step = inj_mem[inj_ptr][39:8];
+                    inj_addr = inj_mem[inj_ptr][7:4];
+                    inj_val  = inj_mem[inj_ptr][3:0];
+                    // FORCE WRITE to RAM
+                    u_cpu.u_ram.mem[inj_addr] = inj_val;
+                    $display("[INJECT] Step:%0d RAM[%h]=%h", inj_step, inj_addr, inj_val);
                 end
-                $fclose(file);
+                inj_ptr = inj_ptr + 1;
             end
             // -----------------------
 
@@ -152,6 +352,7 @@ module cpu_tb_gui;
             // 3. Log the RAM Update (Python reads this to update the table)
             // Format: [RAM] Addr:<HexAddr> Val:<HexData>
             $display("[RAM] Addr:%h Val:%h", dest, ram_val);
+            if (pc % FLUSH_EVERY == FLUSH_EVERY - 1) $fflush;
             
             // Re-align
             @(negedge clk);
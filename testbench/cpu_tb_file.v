@@ -14,9 +14,11 @@ module cpu_tb_file;
     reg         reset_n;
     reg  [10:0] instruction;
 
-    // Instruction Memory (Simulated)
-    // capable of holding up to 256 instructions
-    reg [10:0] prog_mem [0:255]; 
+    // Instruction Stream (Simulated)
+    // Words are read from program.hex one line at a time while the
+    // CPU runs, so there is no fixed program length limit
+    integer prog_fd;
+    reg [8*1024:1] prog_line;
     integer pc; // Program Counter (Index)
 
     // Helper strings for printing
@@ -46,9 +48,9 @@ module cpu_tb_file;
     // 4. TEST SEQUENCE
     // ===============================================================
     initial begin
-        // 1. Load the Hex File
+        // 1. Open the Hex File
         // Ensure you have a file named "program.hex" in the same folder
-        $readmemh("/home/sriram/Projects/4_Bit_CPU/program.hex", prog_mem);
+        prog_fd = $fopen("/home/sriram/Projects/4_Bit_CPU/program.hex", "r");
 
         // 2. Initialize
         reset_n = 0;
@@ -67,13 +69,13 @@ module cpu_tb_file;
         @(negedge clk); // Align to negative edge for driving inputs
 
         // 5. Execution Loop
-        for (pc = 0; pc < 256; pc = pc + 1) begin
+        for (pc = 0; ; pc = pc + 1) begin
             
-            // Fetch instruction from our simulated memory array
-            instruction = prog_mem[pc];
+            // Fetch the next instruction from the program stream
+            fetch_instruction();
 
-            // STOP Condition: If instruction is undefined (x) or 0 (assuming empty ROM is 0), stop.
-            // Note: 000 is actually STO 0 0, so be careful. We check for 'x' which readmemh leaves for empty lines.
+            // STOP Condition: If instruction is undefined (x), stop.
+            // Note: 000 is actually STO 0 0, so be careful. fetch_instruction returns 'x' at end of file.
             if (instruction === 11'bx) begin
                 $display("========================================================================================================");
                 $display("[INFO] End of Program reached at PC=%0d.", pc);
@@ -98,6 +100,26 @@ module cpu_tb_file;
         end
     end
 
+    // ===============================================================
+    // TASK: Read The Next Instruction (x at end of file)
+    // ===============================================================
+    // Lines that do not start with a hex word (blank, // comments)
+    // are skipped, like $readmemh does.
+    task fetch_instruction;
+        integer r;
+        reg [10:0] word;
+        begin
+            instruction = 11'bx;
+            r = 0;
+            while (prog_fd && r != 1 && !$feof(prog_fd)) begin
+                prog_line = 0;
+                if ($fgets(prog_line, prog_fd) > 0)
+                    r = $sscanf(prog_line, "%h", word);
+            end
+            if (r == 1) instruction = word;
+        end
+    endtask
+
     // ===============================================================
     // TASK: Run One Instruction Cycle
     // ===============================================================
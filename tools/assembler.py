@@ -4,6 +4,13 @@
 # Converts custom assembly syntax into 11-bit machine code.
 # Works in both CLI (python3 assembler.py program.asm)
 # and GUI mode (import assemble_text / assemble_file).
+# assemble_stream() handles arbitrarily large sources line by
+# line with bounded memory (the CLI streams straight to .hex).
+#
+# Packed program image (.bin, little-endian):
+#   header  "CPUIMAGE" | u32 version | u32 count
+#   words   count x u16 (11-bit instruction, upper bits 0)
+# ProgramImage.load(path, mmap=True) maps it without copying.
 #
 # Instruction Format: [10:8]=opcode, [7:4]=op1, [3:0]=op2
 # ------------------------------------------------------------
@@ -18,6 +25,11 @@
 import re
 import sys
 import os
+import time
+import mmap as _mmap
+import struct
+import argparse
+from array import array
 
 # ------------------------------------------------------------
 # OPCODE MAP (instruction set)
@@ -32,6 +44,33 @@ OPC = {
     "NOT": 0b110,
 }
 
+# ------------------------------------------------------------
+# TOKENIZER TABLES (compiled once)
+# ------------------------------------------------------------
+_COMMENT_RE = re.compile(r";|//")
+_SEP_RE = re.compile(r"[,\s]+")
+
+# Operand count per mnemonic
+ARITY = {m: 1 if m == "NOT" else 2 for m in OPC}
+
+# Common spellings of every 4-bit value; anything else falls back to parse_imm()
+_IMM = {}
+for _v in range(16):
+    for _tok in (str(_v), f"{_v:02d}", f"0x{_v:x}", f"0x{_v:02x}", f"0b{_v:b}", f"0b{_v:04b}"):
+        _IMM[_tok] = _v
+del _v, _tok
+
+STREAM_CACHE_LINES = 4096   # assemble_stream(): distinct lines remembered at once
+
+# ------------------------------------------------------------
+# PROGRAM IMAGE FORMAT
+# ------------------------------------------------------------
+IMAGE_MAGIC = b"CPUIMAGE"
+IMAGE_VERSION = 1
+IMAGE_HEADER = struct.Struct("<8sII")
+IMAGE_CHUNK = 65536   # words buffered per write
+WORD_MASK = 0x7FF
+
 # ------------------------------------------------------------
 # Helper: Parse immediate or operand value (STRICT 4-bit)
 # ------------------------------------------------------------
@@ -55,39 +94,66 @@ def parse_imm(tok: str) -> int:
 # ------------------------------------------------------------
 # Assemble a single line into a 11-bit binary word
 # ------------------------------------------------------------
+def _operand(tok: str) -> int:
+    val = _IMM.get(tok.lower())
+    return parse_imm(tok) if val is None else val
+
 def assemble_line(line: str):
     # Remove comments (";" or "//")
-    line = re.split(r";|//", line, 1)[0].strip()
+    m = _COMMENT_RE.search(line)
+    if m:
+        line = line[:m.start()]
+    line = line.strip()
     if not line:
         return None  # skip blank/comment-only lines
 
-    parts = re.split(r"[,\s]+", line.strip())
+    parts = _SEP_RE.split(line)
     mnem = parts[0].upper()
 
-    if mnem not in OPC:
+    opc = OPC.get(mnem)
+    if opc is None:
         raise ValueError(f"Unknown instruction: '{mnem}'")
 
     # Instruction format validation
-    if mnem == "NOT":
+    if ARITY[mnem] == 1:
         if len(parts) != 2:
             raise ValueError(f"Invalid syntax for NOT — expected: NOT <op1>")
-        op1 = parse_imm(parts[1])
+        op1 = _operand(parts[1])
         op2 = 0
     else:
         if len(parts) != 3:
             raise ValueError(f"Invalid syntax for {mnem} — expected: {mnem} <op1> <op2>")
-        op1 = parse_imm(parts[1])
-        op2 = parse_imm(parts[2])
+        op1 = _operand(parts[1])
+        op2 = _operand(parts[2])
 
-    opc = OPC[mnem] & 0x7
-    word = (opc << 8) | (op1 << 4) | op2   # pack 11-bit instruction
+    word = ((opc & 0x7) << 8) | (op1 << 4) | op2   # pack 11-bit instruction
     return word
 
+# ------------------------------------------------------------
+# Source map: instruction index (PC) <-> 1-based source line
+# ------------------------------------------------------------
+class SourceMap:
+    def __init__(self, pc_to_line=None):
+        self.pc_to_line = pc_to_line if pc_to_line is not None else []
+        self.line_to_pc = {line: pc for pc, line in enumerate(self.pc_to_line)}
+
+    def line_of(self, pc):
+        """Source line of instruction `pc`, or None"""
+        return self.pc_to_line[pc] if 0 <= pc < len(self.pc_to_line) else None
+
+    def pc_of(self, line):
+        """Instruction index assembled from `line`, or None (blank/comment/error)"""
+        return self.line_to_pc.get(line)
+
 # ------------------------------------------------------------
 # Assemble multi-line assembly text (used in GUI)
 # ------------------------------------------------------------
-def assemble_text(text: str):
-    words, hex_lines, errors = [], [], []
+def assemble_text(text: str, with_map=False):
+    """
+    Returns (words, hex_lines, errors), plus a SourceMap built in the
+    same pass when `with_map` is set.
+    """
+    words, hex_lines, errors, pc_to_line = [], [], [], []
     
     for lineno, raw in enumerate(text.splitlines(), start=1):
         try:
@@ -95,21 +161,126 @@ def assemble_text(text: str):
             if w is not None:
                 words.append(w)
                 hex_lines.append(f"{w:03x}")
+                pc_to_line.append(lineno)
         except Exception as e:
             # Capture error with line number instead of crashing
             errors.append(f"Line {lineno}: {str(e)}")
             
+    if with_map:
+        return words, hex_lines, errors, SourceMap(pc_to_line)
     return words, hex_lines, errors
 
+# ------------------------------------------------------------
+# Streaming assembly (large / machine-generated sources)
+# ------------------------------------------------------------
+def assemble_stream(fileobj):
+    """
+    Reads `fileobj` line by line and yields (lineno, word, error) per
+    non-blank line: `word` is the 11-bit instruction, or None with
+    `error` set to the message. Memory use does not grow with the file.
+    """
+    cache = {}   # Repeated lines are common in generated code
+    for lineno, raw in enumerate(fileobj, start=1):
+        entry = cache.get(raw)
+        if entry is None:
+            try:
+                entry = (assemble_line(raw), None)
+            except Exception as e:
+                entry = (None, str(e))
+            if len(cache) >= STREAM_CACHE_LINES:
+                cache.clear()
+            cache[raw] = entry
+
+        w, err = entry
+        if err is not None:
+            yield lineno, None, f"Line {lineno}: {err}"
+        elif w is not None:
+            yield lineno, w, None
+
+# ------------------------------------------------------------
+# Incremental assembly (GUI live diagnostics)
+# Caches assemble_line() per line content, so only edited lines
+# are re-parsed. Result fields match assemble_text().
+# ------------------------------------------------------------
+class IncrementalAssembler:
+    def __init__(self):
+        self.cache = {}          # line text -> (word or None, error message or None)
+        self.text = None
+        self.words, self.hex_lines, self.errors = [], [], []
+        self.error_lines = []    # 1-based line numbers of self.errors
+        self.source_map = SourceMap()
+        self.hits = 0
+        self.misses = 0
+        self.time_spent = 0.0    # seconds inside update()
+
+    def update(self, text: str):
+        """Re-assembles `text`, parsing only lines not seen before"""
+        if text == self.text:
+            return self.words, self.hex_lines, self.errors
+
+        t0 = time.perf_counter()
+        words, hex_lines, errors, error_lines, pc_to_line = [], [], [], [], []
+        cache = self.cache
+        lines = text.splitlines()
+
+        for lineno, raw in enumerate(lines, start=1):
+            entry = cache.get(raw)
+            if entry is None:
+                self.misses += 1
+                try:
+                    entry = (assemble_line(raw), None)
+                except Exception as e:
+                    entry = (None, str(e))
+                cache[raw] = entry
+            else:
+                self.hits += 1
+
+            w, err = entry
+            if err is not None:
+                errors.append(f"Line {lineno}: {err}")
+                error_lines.append(lineno)
+            elif w is not None:
+                words.append(w)
+                hex_lines.append(f"{w:03x}")
+                pc_to_line.append(lineno)
+
+        # Drop entries for lines that no longer exist once the cache bloats
+        if len(cache) > 2 * len(lines) + 1024:
+            self.cache = {raw: cache[raw] for raw in lines}
+
+        self.text = text
+        self.words, self.hex_lines, self.errors = words, hex_lines, errors
+        self.error_lines = error_lines
+        self.source_map = SourceMap(pc_to_line)
+        self.time_spent += time.perf_counter() - t0
+        return words, hex_lines, errors
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "time_spent": self.time_spent,
+            "cached_lines": len(self.cache),
+        }
+
 # ------------------------------------------------------------
 # Assemble directly from a file (for CLI or GUI)
 # ------------------------------------------------------------
 def assemble_file(path: str):
     if not os.path.exists(path):
         raise FileNotFoundError(f"Assembly file not found: {path}")
+
+    words, hex_lines, errors = [], [], []
     with open(path, "r") as f:
-        text = f.read()
-    return assemble_text(text)
+        for lineno, w, err in assemble_stream(f):
+            if err is not None:
+                errors.append(err)
+            else:
+                words.append(w)
+                hex_lines.append(f"{w:03x}")
+    return words, hex_lines, errors
 
 # ------------------------------------------------------------
 # Write .hex file (for $readmemh in Verilog)
@@ -119,29 +290,186 @@ def write_memhex(hex_lines, path="program.hex"):
         for h in hex_lines:
             f.write(h + "\n")
 
+# ------------------------------------------------------------
+# Packed binary program image (alternative to write_memhex)
+# ------------------------------------------------------------
+class ImageWriter:
+    """Streams words into a program image; the header count is patched on close()"""
+    def __init__(self, path):
+        self.f = open(path, "wb")
+        self.f.write(IMAGE_HEADER.pack(IMAGE_MAGIC, IMAGE_VERSION, 0))
+        self.buf = array("H")
+        self.count = 0
+
+    def append(self, word):
+        self.buf.append(word & WORD_MASK)
+        if len(self.buf) >= IMAGE_CHUNK:
+            self.flush()
+
+    def extend(self, words):
+        for w in words:
+            self.append(w)
+
+    def flush(self):
+        if sys.byteorder != "little":
+            self.buf.byteswap()
+        self.buf.tofile(self.f)
+        self.count += len(self.buf)
+        self.buf = array("H")
+
+    def close(self):
+        if self.f.closed:
+            return
+        self.flush()
+        self.f.seek(0)
+        self.f.write(IMAGE_HEADER.pack(IMAGE_MAGIC, IMAGE_VERSION, self.count))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_image(words, path="program.bin"):
+    with ImageWriter(path) as w:
+        w.extend(words)
+
+def is_image(path):
+    """True if `path` starts with the program image magic"""
+    with open(path, "rb") as f:
+        return f.read(len(IMAGE_MAGIC)) == IMAGE_MAGIC
+
+class ProgramImage:
+    """Sequence of instruction words backed by an array or a read-only mapping"""
+    def __init__(self):
+        self.words = array("H")
+        self._map = None
+        self._view = None
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getitem__(self, i):
+        return self.words[i]
+
+    def __iter__(self):
+        return iter(self.words)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """
+        Loads a program image. With mmap=True `words` is a read-only
+        memoryview over the mapped file (no copy; worker processes
+        mapping the same file share its pages); call close() when done.
+        """
+        image = cls()
+        with open(path, "rb") as f:
+            magic, version, count = IMAGE_HEADER.unpack(f.read(IMAGE_HEADER.size))
+            if magic != IMAGE_MAGIC or version != IMAGE_VERSION:
+                raise ValueError(f"Not a v{IMAGE_VERSION} program image: {path}")
+
+            if mmap and sys.byteorder == "little" and count:
+                image._map = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+                image._view = memoryview(image._map)
+                off = IMAGE_HEADER.size
+                image.words = image._view[off:off + 2 * count].cast("H")
+            else:
+                image.words.fromfile(f, count)
+                if sys.byteorder != "little":
+                    image.words.byteswap()
+        return image
+
+    def close(self):
+        """Releases the mapping of an image loaded with mmap=True"""
+        if self._map is None:
+            return
+        self.words.release()
+        self.words = array("H")
+        self._view.release()
+        self._view = None
+        self._map.close()
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 # ------------------------------------------------------------
 # CLI Main entry
 # ------------------------------------------------------------
+MAX_REPORTED_ERRORS = 50
+
+def assemble_to_file(asm_path, out_path, listing=True, fmt="hex"):
+    """
+    Streams `asm_path` into `out_path` one instruction at a time, as
+    $readmemh text (fmt="hex") or a packed program image (fmt="bin").
+    The output only replaces `out_path` if the whole source assembled.
+    Returns (instruction count, error count).
+    """
+    tmp_path = out_path + ".tmp"
+    count = n_errors = 0
+    try:
+        with open(asm_path, "r") as src, \
+             (ImageWriter(tmp_path) if fmt == "bin" else open(tmp_path, "w")) as out:
+            emit = out.append if fmt == "bin" else (lambda w: out.write(f"{w:03x}\n"))
+            for lineno, w, err in assemble_stream(src):
+                if err is not None:
+                    n_errors += 1
+                    if n_errors <= MAX_REPORTED_ERRORS:
+                        print(f"[ASM ERROR] {err}")
+                    continue
+                emit(w)
+                if listing:
+                    print(f" {count:02d}   |   {w:03X}   |   {w:011b}")
+                count += 1
+        if n_errors:
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count, n_errors
+
 def main():
-    if len(sys.argv) > 1:
-        asm_path = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Assemble 4-bit CPU source into a $readmemh file")
+    parser.add_argument("asm", nargs="?", help="assembly source (omit for the built-in demo)")
+    parser.add_argument("-o", "--output", help="output path (default: <asm>.hex / <asm>.bin)")
+    parser.add_argument("-f", "--format", choices=("hex", "bin"), default="hex",
+                        help="$readmemh text or packed program image")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not print the listing")
+    opts = parser.parse_args()
+
+    if opts.asm:
+        asm_path = opts.asm
+        out_path = opts.output or os.path.splitext(asm_path)[0] + "." + opts.format
+        if not opts.quiet:
+            print("----------------------------------------------------")
+            print("ADDR |   HEX   |   BINARY (11-bit)")
+            print("----------------------------------------------------")
+        t0 = time.perf_counter()
         try:
-            words, hex_lines = assemble_file(asm_path)
+            count, n_errors = assemble_to_file(asm_path, out_path, listing=not opts.quiet,
+                                               fmt=opts.format)
         except Exception as e:
             print(f"\n❌ Assembly failed: {e}")
             sys.exit(1)
+        dt = time.perf_counter() - t0
 
-        out_path = os.path.splitext(asm_path)[0] + ".hex"
-        write_memhex(hex_lines, out_path)
+        if n_errors:
+            if n_errors > MAX_REPORTED_ERRORS:
+                print(f"[ASM ERROR] ... {n_errors - MAX_REPORTED_ERRORS} more")
+            print(f"\n❌ Assembly failed: {n_errors} errors in '{asm_path}'")
+            sys.exit(1)
 
+        if not opts.quiet:
+            print("----------------------------------------------------")
         print(f"\n✅ Assembled '{asm_path}' → '{out_path}'")
-        print("----------------------------------------------------")
-        print("ADDR |   HEX   |   BINARY (11-bit)")
-        print("----------------------------------------------------")
-        for i, (w, h) in enumerate(zip(words, hex_lines)):
-            print(f" {i:02d}   |   {h.upper():>3}   |   {w:011b}")
-        print("----------------------------------------------------")
-        print("✅ Assembly complete!\n")
+        print(f"{count} instructions in {dt:.2f} s")
         sys.exit(0)
 
     # Demo mode (no args)
@@ -153,7 +481,7 @@ def main():
     SUB 0x1 0x7
     NOT 0xF
     """
-    words, hex_lines = assemble_text(demo)
+    words, hex_lines, errors = assemble_text(demo)
     write_memhex(hex_lines, "program.hex")
     for w, h in zip(words, hex_lines):
         print(f"{h.upper():>3}   ({w:011b})")
@@ -165,7 +493,14 @@ def main():
 __all__ = [
     "assemble_text",
     "assemble_file",
+    "assemble_stream",
+    "IncrementalAssembler",
+    "SourceMap",
     "write_memhex",
+    "write_image",
+    "is_image",
+    "ImageWriter",
+    "ProgramImage",
     "OPC",
 ]
 
@@ -0,0 +1,195 @@
+# ============================================================
+# 4-bit CPU Batch Executor (NumPy)
+# ------------------------------------------------------------
+# Runs one program over many initial RAM images, or many
+# programs at once, as vectorized ops over an (N,16) uint8
+# RAM array. Architectural results match emulator.py /
+# bridge_tb: RAM[op1] <- ALU(RAM[op1], op2), cout latched
+# from the last instruction.
+#
+# Usage:
+#   python3 batch.py program.asm --rows 100000
+#   python3 batch.py program.bin --rows 100000   (packed image)
+#
+# Instruction Format: [10:8]=opcode, [7:4]=op1, [3:0]=op2
+# ============================================================
+
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from assembler import assemble_file, is_image, ProgramImage
+from emulator import (
+    OPC_STO, OPC_ADD, OPC_SUB, OPC_AND, OPC_OR, OPC_XOR, OPC_NOT,
+    get_opcode, get_op1, get_op2,
+)
+
+# ------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------
+def decode_words(words):
+    """Splits instruction words into (opcode, op1, op2) arrays"""
+    w = np.asarray(words, dtype=np.int32)
+    return (w >> 8) & 0x7, (w >> 4) & 0xF, w & 0xF
+
+def _as_ram_t(ram, n):
+    """Returns a contiguous (16,N) uint8 copy of `ram` (zeros if None)"""
+    if ram is None:
+        if n is None:
+            raise ValueError("Either ram or n must be given")
+        return np.zeros((16, n), dtype=np.uint8)
+
+    ram = np.asarray(ram)
+    if ram.ndim != 2 or ram.shape[1] != 16:
+        raise ValueError(f"RAM array must have shape (N,16), got {ram.shape}")
+    # Address-major layout: every instruction touches one contiguous row
+    return np.ascontiguousarray(ram.T, dtype=np.uint8) & 0xF
+
+# ------------------------------------------------------------
+# Vectorized ALU: returns (f, cout) for per-row opcodes
+# ------------------------------------------------------------
+def alu_vec(opcode, a, b):
+    opcode = np.asarray(opcode)
+    a = np.asarray(a, dtype=np.uint8)
+    b = np.asarray(b, dtype=np.uint8)
+
+    # Arithmetic path (STO/ADD/SUB): full_adder4(a', adder_b, cin)
+    is_sub = opcode == OPC_SUB
+    a_arith = np.where(opcode == OPC_STO, 0, a).astype(np.uint8)
+    adder_b = np.where(is_sub, ~b & 0xF, b).astype(np.uint8)
+    total = a_arith + adder_b + is_sub.astype(np.uint8)
+    arith = opcode <= OPC_SUB
+
+    # Reserved opcode -> ALU_TRANSFER: f = a + 0, cout = 0
+    f = np.select(
+        [arith, opcode == OPC_AND, opcode == OPC_OR, opcode == OPC_XOR, opcode == OPC_NOT],
+        [total & 0xF, a & b, a | b, a ^ b, ~a & 0xF],
+        default=a,
+    ).astype(np.uint8)
+    cout = np.where(arith, total >> 4, 0).astype(np.uint8)
+    return f, cout
+
+# ------------------------------------------------------------
+# One program, N RAM images
+# ------------------------------------------------------------
+def run_batch(words, ram=None, n=None):
+    """
+    Applies `words` (from assemble_text) to every RAM image.
+    `ram` is an (N,16) array of initial images; if omitted, `n`
+    zeroed images are used (the state after reset).
+    Returns (final_ram (N,16) uint8, cout (N,) uint8).
+    """
+    ram_t = _as_ram_t(ram, n)
+    cout = np.zeros(ram_t.shape[1], dtype=np.uint8)
+    tmp = np.empty_like(cout)
+
+    for word in words:
+        opcode, op1, op2 = get_opcode(word), get_op1(word), get_op2(word)
+        row = ram_t[op1]
+
+        if opcode == OPC_STO:
+            row[:] = op2
+            cout[:] = 0
+        elif opcode == OPC_ADD:
+            np.add(row, op2, out=tmp)
+            np.right_shift(tmp, 4, out=cout)
+            np.bitwise_and(tmp, 0xF, out=row)
+        elif opcode == OPC_SUB:
+            # ALU_SUB_A_B_1: a + ~b + 1
+            np.add(row, (~op2 & 0xF) + 1, out=tmp)
+            np.right_shift(tmp, 4, out=cout)
+            np.bitwise_and(tmp, 0xF, out=row)
+        elif opcode == OPC_AND:
+            np.bitwise_and(row, op2, out=row)
+            cout[:] = 0
+        elif opcode == OPC_OR:
+            np.bitwise_or(row, op2, out=row)
+            cout[:] = 0
+        elif opcode == OPC_XOR:
+            np.bitwise_xor(row, op2, out=row)
+            cout[:] = 0
+        elif opcode == OPC_NOT:
+            np.bitwise_xor(row, 0xF, out=row)
+            cout[:] = 0
+        else:
+            # Reserved: ALU_TRANSFER writes RAM[op1] back unchanged
+            cout[:] = 0
+
+    return np.ascontiguousarray(ram_t.T), cout
+
+# ------------------------------------------------------------
+# N programs, N RAM images (row i runs programs[i])
+# ------------------------------------------------------------
+def run_programs(programs, ram=None):
+    """
+    `programs` is an (N,L) integer array of instruction words,
+    padded with -1 after each program's end (like the x entries
+    bridge_tb stops on). Returns (final_ram, cout) as run_batch.
+    """
+    programs = np.asarray(programs, dtype=np.int32)
+    if programs.ndim != 2:
+        raise ValueError(f"Program array must have shape (N,L), got {programs.shape}")
+    n = programs.shape[0]
+    ram_t = _as_ram_t(ram, n)
+    if ram_t.shape[1] != n:
+        raise ValueError("Program and RAM arrays must have the same number of rows")
+
+    cout = np.zeros(n, dtype=np.uint8)
+    alive = np.ones(n, dtype=bool)
+    rows = np.arange(n)
+
+    for col in programs.T:
+        alive &= col >= 0
+        if not alive.any():
+            break
+        idx = rows[alive]
+        opcode, op1, op2 = decode_words(col[alive])
+        f, c = alu_vec(opcode, ram_t[op1, idx], op2)
+        ram_t[op1, idx] = f
+        cout[idx] = c
+
+    return np.ascontiguousarray(ram_t.T), cout
+
+# ------------------------------------------------------------
+# CLI Main entry (throughput benchmark)
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Run a program over many random RAM images")
+    parser.add_argument("asm", help="assembly source or packed program image")
+    parser.add_argument("--rows", type=int, default=100000, help="number of RAM images")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for initial images")
+    opts = parser.parse_args()
+
+    if is_image(opts.asm):
+        with ProgramImage.load(opts.asm) as image:
+            words = image.words.tolist()
+    else:
+        words, hex_lines, errors = assemble_file(opts.asm)
+        if errors:
+            for e in errors:
+                print(f"[ASM ERROR] {e}")
+            sys.exit(1)
+
+    rng = np.random.default_rng(opts.seed)
+    ram = rng.integers(0, 16, size=(opts.rows, 16), dtype=np.uint8)
+
+    t0 = time.perf_counter()
+    final, cout = run_batch(words, ram)
+    dt = time.perf_counter() - t0
+
+    evals = opts.rows * len(words)
+    print(f"{opts.rows} images x {len(words)} instructions in {dt * 1000:.1f} ms "
+          f"({evals / dt / 1e6:.1f} M instr-evals/s)")
+    print(f"row 0: RAM={' '.join(f'{v:X}' for v in final[0])} cout={cout[0]}")
+
+__all__ = [
+    "decode_words",
+    "alu_vec",
+    "run_batch",
+    "run_programs",
+]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# ============================================================
+# 4-bit CPU Console Buffer
+# ------------------------------------------------------------
+# Bounded backend for the GUI console. Messages go into a ring
+# of the last max_lines lines; the widget is brought up to date
+# once per frame from take(), which returns
+#
+#   text : the new visible lines as one string (one insert)
+#   drop : lines to delete from the top of the widget
+#
+# so the widget never holds more than max_lines lines either.
+# Lines pushed out of the ring are appended to log_path (opened
+# on the first spill, below a session header); close() writes
+# the rest, so the log holds the whole session once anything has
+# spilled. A log above LOG_MAX_BYTES is first rotated to
+# <log_path>.1 (replacing the previous one). Multi-line messages
+# are split, so the ring and widget counts are in Text lines.
+#
+# Levels (lowest first): trace (step transcript), info, warn,
+# error. Messages below the display level stay in the ring and
+# the log; changing the level redraws the widget from the ring.
+#
+# Usage:
+#   python3 consolebuf.py console.log --level warn   (filter a log)
+# ============================================================
+
+import os
+import re
+import sys
+import time
+import argparse
+from collections import deque
+
+# ------------------------------------------------------------
+# CONSTANTS
+# ------------------------------------------------------------
+TRACE = 0
+INFO  = 1
+WARN  = 2
+ERROR = 3
+
+LEVEL_NAMES = ["trace", "info", "warn", "error"]
+
+CONSOLE_LINES = 5000   # Default ring size
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "console.log")
+LOG_MAX_BYTES = 16 << 20
+
+_TAG_RE = re.compile(r"^\[([A-Z][A-Z /]*)\]")
+_TAG_LEVELS = {"WARN": WARN, "BUSY": WARN, "ABORT": ERROR, "CRITICAL": ERROR}
+
+def level_of(text):
+    """Level of a console line, from its [TAG] (step transcript lines are trace)"""
+    if text.startswith("[PC ") or text.startswith("    "):
+        return TRACE
+    m = _TAG_RE.match(text)
+    if m is None:
+        return INFO
+    tag = m.group(1)
+    if "ERROR" in tag:
+        return ERROR
+    return _TAG_LEVELS.get(tag, INFO)
+
+# ------------------------------------------------------------
+# Ring buffer
+# ------------------------------------------------------------
+class ConsoleBuffer:
+    def __init__(self, max_lines=CONSOLE_LINES, log_path=LOG_PATH, level=TRACE):
+        self.max_lines = max(1, max_lines)
+        self.log_path = log_path
+        self.level = level
+        self.ring = deque()                          # (level, text), oldest first
+        self.pending = deque(maxlen=self.max_lines)  # Visible lines not taken yet
+        self.shown = 0                               # Lines the widget holds
+        self.cleared = False                         # Widget must be emptied first
+        self.spilled = 0
+        self._log = None
+
+    def write(self, text, level=None):
+        """Adds a message; continuation lines share the level of its first line"""
+        if level is None:
+            level = level_of(text)
+        for line in text.split("\n"):
+            if len(self.ring) == self.max_lines:
+                self._spill(self.ring.popleft()[1])
+            self.ring.append((level, line))
+            if level >= self.level:
+                self.pending.append(line)
+
+    def extend(self, lines, level=None):
+        for text in lines:
+            self.write(text, level)
+
+    def _spill(self, text):
+        if self.log_path is None:
+            return
+        if self._log is None:
+            self._open_log()
+        self._log.write(text + "\n")
+        self.spilled += 1
+
+    def _open_log(self):
+        try:
+            if os.path.getsize(self.log_path) > LOG_MAX_BYTES:
+                os.replace(self.log_path, self.log_path + ".1")
+        except OSError:
+            pass   # No log yet
+        self._log = open(self.log_path, "a")
+        self._log.write(f"=== Console session {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+
+    def set_level(self, level):
+        """Changes the display level; the next take() redraws from the ring"""
+        self.level = level
+        self.pending.clear()
+        self.pending.extend(text for lv, text in self.ring if lv >= level)
+        self.cleared = True
+
+    def take(self):
+        """(text, drop) bringing the widget up to date; see the header"""
+        lines = list(self.pending)
+        self.pending.clear()
+        drop = self.shown if self.cleared else 0
+        self.cleared = False
+
+        total = self.shown - drop + len(lines)
+        if total > self.max_lines:
+            drop += total - self.max_lines
+            total = self.max_lines
+        self.shown = total
+        if self._log is not None:
+            self._log.flush()
+        return ("\n".join(lines) + "\n" if lines else ""), drop
+
+    def close(self):
+        """Writes the ring to the log (if anything spilled) and closes it"""
+        if self._log is None:
+            return
+        for _, text in self.ring:
+            self._log.write(text + "\n")
+        self._log.close()
+        self._log = None
+
+# ------------------------------------------------------------
+# CLI Main entry
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Print the lines of a console log at or above a level")
+    parser.add_argument("log", nargs="?", default=LOG_PATH, help="spilled console log")
+    parser.add_argument("--level", choices=LEVEL_NAMES, default="info")
+    opts = parser.parse_args()
+
+    level = LEVEL_NAMES.index(opts.level)
+    try:
+        f = open(opts.log, "r")
+    except OSError as e:
+        print(e)
+        sys.exit(1)
+    with f:
+        for line in f:
+            if level_of(line) >= level:
+                sys.stdout.write(line)
+
+__all__ = [
+    "ConsoleBuffer",
+    "level_of",
+    "TRACE", "INFO", "WARN", "ERROR",
+    "LEVEL_NAMES",
+]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# ============================================================
+# 4-bit CPU Breakpoint / Watchpoint Engine
+# ------------------------------------------------------------
+# Stop conditions are compiled once into lookup tables, so the
+# per-instruction cost is a set lookup and a couple of shifts:
+#
+#   pcs        : set of PCs to stop *before*
+#   ram_masks  : ram_masks[addr] bit v set -> stop after RAM[addr] = v
+#   carry_mask : bit c set -> stop after an instruction with carry c
+#
+# Watch expressions (separated by ';' or ','):
+#   ram[3]             any write to RAM[3]
+#   ram[3] == 9        write of 9   (also !=, <, <=, >, >=)
+#   carry              carry set (carry == 0 for clear)
+#   pc == 12           same as a breakpoint on PC 12
+#
+# Conditions run either over a parsed Trace (scan) or directly
+# on the emulator (run_until); neither touches Tk.
+#
+# Usage:
+#   python3 debugger.py prog.asm --break 12 --watch "ram[3]==9; carry"
+# ============================================================
+
+import re
+import sys
+import argparse
+
+from assembler import assemble_file, ProgramImage, is_image
+from emulator import CPUEmulator, alu_eval, get_op1, OPC_ALU_SEL, OPC_STO
+from tracestore import EV_EXEC, EV_RAM, EV_INJECT, EV_DONE
+
+_WATCH_RE = re.compile(
+    r"^(?:ram\s*\[\s*(?P<addr>(?:0x)?[0-9a-f]+)\s*\]|(?P<name>carry|pc))"
+    r"\s*(?:(?P<cmp>==|!=|<=|>=|<|>)\s*(?P<value>(?:0x)?[0-9a-f]+))?$",
+    re.IGNORECASE)
+
+_CMP = {
+    "==": lambda v, x: v == x,
+    "!=": lambda v, x: v != x,
+    "<":  lambda v, x: v < x,
+    "<=": lambda v, x: v <= x,
+    ">":  lambda v, x: v > x,
+    ">=": lambda v, x: v >= x,
+}
+
+def _int(text):
+    return int(text, 16) if text.lower().startswith("0x") else int(text)
+
+def value_mask(cmp, value, width=16):
+    """Bit v set for every value v (< width) satisfying `v cmp value`"""
+    if cmp is None:
+        return (1 << width) - 1
+    return sum(1 << v for v in range(width) if _CMP[cmp](v, value))
+
+def carry_of(op, old, src):
+    """ALU carry of instruction (op, src) applied to RAM[dest] == old (reg_alu semantics)"""
+    return alu_eval(OPC_ALU_SEL.get(op, 0), 0 if op == OPC_STO else old, src)[1]
+
+# ------------------------------------------------------------
+# Compiled stop conditions
+# ------------------------------------------------------------
+class StopConditions:
+    def __init__(self):
+        self.pcs = set()
+        self.ram_masks = [0] * 16
+        self.carry_mask = 0
+        self.labels = {}   # ("ram", addr) / ("carry",) -> expression text
+
+    def __bool__(self):
+        return bool(self.pcs) or any(self.ram_masks) or bool(self.carry_mask)
+
+    def add_breakpoint(self, pc):
+        self.pcs.add(pc)
+
+    def add_watch(self, expr):
+        """Compiles one watch expression; raises ValueError if it is not understood"""
+        m = _WATCH_RE.match(expr.strip())
+        if m is None:
+            raise ValueError(f"Bad watch expression '{expr}' (try ram[3], ram[3]==9, carry, pc==12)")
+        cmp = m.group("cmp")
+        value = _int(m.group("value")) if m.group("value") else None
+        name = (m.group("name") or "ram").lower()
+
+        if name == "pc":
+            if cmp != "==" or value is None:
+                raise ValueError(f"Only 'pc == N' is supported: '{expr}'")
+            self.add_breakpoint(value)
+            return
+        limit = 1 if name == "carry" else 0xF
+        if value is not None and value > limit:
+            raise ValueError(f"Compare value out of range (0-{limit:X}): '{expr}'")
+
+        mask = value_mask(cmp, value, limit + 1) if cmp else (0b10 if name == "carry" else 0xFFFF)
+        if mask == 0:
+            raise ValueError(f"Watch can never be true: '{expr}'")
+
+        if name == "carry":
+            self.carry_mask |= mask
+            self.labels[("carry",)] = expr.strip()
+        else:
+            addr = _int(m.group("addr"))
+            if addr > 0xF:
+                raise ValueError(f"RAM address out of range (0-F): '{expr}'")
+            self.ram_masks[addr] |= mask
+            self.labels[("ram", addr)] = expr.strip()
+
+    def add_watches(self, text):
+        for expr in re.split(r"[;,]", text):
+            if expr.strip():
+                self.add_watch(expr)
+
+    # --------------------------------------------------------
+    def scan(self, trace, start, ram=None, step_over=True):
+        """
+        First stop in trace rows [start, end): (row, reason) or None.
+        Breakpoints stop at their EXEC row (with step_over, one exactly
+        at `start` is the one we are resuming from and is skipped);
+        watchpoints stop after the whole instruction that hit them.
+        `ram` is the RAM image at `start`, needed only for carry watches.
+        """
+        kind_c, pc_c, op_c, addr_c, val_c = trace.kind, trace.pc, trace.op, trace.addr, trace.val
+        pcs, masks, carry_mask = self.pcs, self.ram_masks, self.carry_mask
+        mem = list(ram) if ram is not None else [0] * 16
+        hit = None
+
+        for i in range(start, len(trace)):
+            kind = kind_c[i]
+            if kind == EV_EXEC:
+                if hit is not None:
+                    return i, hit
+                pc = pc_c[i]
+                if pc in pcs and not (step_over and i == start):
+                    return i, f"breakpoint at PC {pc}"
+                if carry_mask:
+                    c = carry_of(op_c[i], mem[addr_c[i]], val_c[i])
+                    if carry_mask >> c & 1:
+                        hit = f"watch {self.labels[('carry',)]} (carry={c}) at PC {pc}"
+            elif kind == EV_RAM or kind == EV_INJECT:
+                addr, val = addr_c[i], val_c[i]
+                mem[addr] = val
+                if masks[addr] >> val & 1:
+                    hit = f"watch {self.labels[('ram', addr)]} (RAM[{addr:X}]={val:X}) at PC {pc_c[i]}"
+            elif kind == EV_DONE and hit is not None:
+                return i, hit
+        if hit is not None:
+            return len(trace), hit
+        return None
+
+    def run_until(self, words, injections=(), cpu=None, start_pc=0, step_over=True):
+        """
+        Direct execution on the emulator (no trace, no output lines).
+        Returns (pc, reason, cpu): pc is the next instruction to run
+        (len(words) at the end, reason None when nothing was hit).
+        With start_pc > 0, `cpu` must hold the state before start_pc.
+        step_over is as for scan().
+        """
+        if cpu is None:
+            cpu = CPUEmulator()
+        if start_pc == 0:
+            cpu.reset()
+            cpu.tick()   # reset_n release (see emulator.run_program)
+
+        pcs, masks, carry_mask = self.pcs, self.ram_masks, self.carry_mask
+        by_pc = {}
+        for inj_pc, addr, val in injections:
+            by_pc.setdefault(inj_pc, []).append((addr & 0xF, val & 0xF))
+
+        for pc in range(start_pc, len(words)):
+            if pc in pcs and not (step_over and pc == start_pc):
+                return pc, f"breakpoint at PC {pc}", cpu
+            word = words[pc]
+            cpu.instruction = word
+            cpu.tick()
+            cpu.tick()
+            cpu.tick()
+
+            # Same order as the trace: INJECT rows, then the RAM row of dest
+            hit = None
+            if carry_mask >> cpu.cout & 1:
+                hit = f"watch {self.labels[('carry',)]} (carry={cpu.cout}) at PC {pc}"
+            for addr, val in by_pc.get(pc, ()):
+                cpu.mem[addr] = val
+                if masks[addr] >> val & 1:
+                    hit = f"watch {self.labels[('ram', addr)]} (RAM[{addr:X}]={val:X}) at PC {pc}"
+            dest = get_op1(word)
+            if masks[dest] >> cpu.mem[dest] & 1:
+                hit = f"watch {self.labels[('ram', dest)]} (RAM[{dest:X}]={cpu.mem[dest]:X}) at PC {pc}"
+            if hit is not None:
+                return pc + 1, hit, cpu
+        return len(words), None, cpu
+
+# ------------------------------------------------------------
+# CLI Main entry
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Run a program on the emulator until a breakpoint/watchpoint")
+    parser.add_argument("program", help="assembly source or packed program image")
+    parser.add_argument("--break", dest="breaks", type=int, action="append", default=[],
+                        help="stop before this PC (repeatable)")
+    parser.add_argument("--watch", default="", help="watch expressions, e.g. \"ram[3]==9; carry\"")
+    opts = parser.parse_args()
+
+    if is_image(opts.program):
+        with ProgramImage.load(opts.program) as image:
+            words = list(image.words)
+    else:
+        words, hex_lines, errors = assemble_file(opts.program)
+        if errors:
+            for e in errors:
+                print(f"[ASM ERROR] {e}")
+            sys.exit(1)
+
+    conds = StopConditions()
+    try:
+        conds.add_watches(opts.watch)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    for pc in opts.breaks:
+        conds.add_breakpoint(pc)
+
+    pc, cpu, at_break = 0, None, False
+    while True:
+        pc, reason, cpu = conds.run_until(words, cpu=cpu, start_pc=pc, step_over=at_break)
+        at_break = reason is not None and reason.startswith("breakpoint")
+        ram = "".join(f"{v:X}" for v in cpu.mem)
+        if reason is None:
+            print(f"[DONE] {pc} instructions, RAM {ram}")
+            return
+        print(f"[BREAK] {reason}: next PC {pc}, RAM {ram}")
+        if pc >= len(words):
+            return
+
+__all__ = [
+    "StopConditions",
+    "value_mask",
+    "carry_of",
+]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+# ============================================================
+# 4-bit CPU Emulator
+# ------------------------------------------------------------
+# Cycle-accurate Python model of cpu_top as driven by
+# testbench/bridge_tb.v. Produces the same [EXEC]/[INJECT]/
+# [RAM]/[DONE] event stream as `vvp cpu_sim`, without
+# compiling or launching Icarus Verilog.
+#
+# Models:
+#   instruction_decoder : INIT/FETCH/EXEC/STORE FSM (decoder_fsm.v)
+#   reg_alu             : alu_sel decode + registered f/cout (reg_alu4.v)
+#   ram16x4             : synchronous 16x4 RAM (ram16x4.v)
+#
+# Usage:
+#   python3 emulator.py program.hex   (or a packed program.bin image)
+# ============================================================
+
+import sys
+
+from assembler import ProgramImage, is_image
+
+# ------------------------------------------------------------
+# CONSTANTS (mirrors src/cpu_defs.vh)
+# ------------------------------------------------------------
+INSTR_W = 11
+
+OPC_STO = 0b000
+OPC_ADD = 0b001
+OPC_SUB = 0b010
+OPC_AND = 0b011
+OPC_OR  = 0b100
+OPC_XOR = 0b101
+OPC_NOT = 0b110
+
+ST_INIT  = 0b00
+ST_FETCH = 0b01
+ST_EXEC  = 0b10
+ST_STORE = 0b11
+
+# {alu_sel[2:0], cin}
+ALU_TRANSFER  = 0b0000
+ALU_INC       = 0b0001
+ALU_ADD_AB    = 0b0010
+ALU_ADD_ABCIN = 0b0011
+ALU_SUB_A_B   = 0b0100
+ALU_SUB_A_B_1 = 0b0101
+ALU_DEC       = 0b0110
+ALU_PASS_A    = 0b0111
+# Logical ops: cin is a don't-care (4'b1xx?), modelled with cin = 0
+ALU_OR_MASK   = 0b1000
+ALU_XOR_MASK  = 0b1010
+ALU_AND_MASK  = 0b1100
+ALU_NOT_MASK  = 0b1110
+
+RAM_ACTIVE = 0
+RAM_IDLE   = 1
+RAM_READ   = 1
+RAM_WRITE  = 0
+
+# Opcode -> ALU select (EXEC state case statement)
+OPC_ALU_SEL = {
+    OPC_STO: ALU_ADD_AB,
+    OPC_ADD: ALU_ADD_AB,
+    OPC_SUB: ALU_SUB_A_B_1,
+    OPC_AND: ALU_AND_MASK,
+    OPC_OR:  ALU_OR_MASK,
+    OPC_XOR: ALU_XOR_MASK,
+    OPC_NOT: ALU_NOT_MASK,
+}
+
+# Opcode -> op_str as printed by bridge_tb (reg [8*3:1])
+OPC_STR = {
+    OPC_STO: "STO",
+    OPC_ADD: "ADD",
+    OPC_SUB: "SUB",
+    OPC_AND: "AND",
+    OPC_OR:  "OR ",
+    OPC_XOR: "XOR",
+    OPC_NOT: "NOT",
+}
+
+# ------------------------------------------------------------
+# Field extraction (`GET_OPCODE / `GET_OP1 / `GET_OP2)
+# ------------------------------------------------------------
+def get_opcode(word: int) -> int:
+    return (word >> 8) & 0x7
+
+def get_op1(word: int) -> int:
+    return (word >> 4) & 0xF
+
+def get_op2(word: int) -> int:
+    return word & 0xF
+
+# ------------------------------------------------------------
+# reg_alu combinational path: returns (next_f, next_cout)
+# ------------------------------------------------------------
+def alu_eval(alu_sel: int, a: int, b: int):
+    s2 = (alu_sel >> 3) & 1
+    sel = (alu_sel >> 1) & 0x3   # {s1, s0}
+    cin = alu_sel & 1
+
+    if s2 == 0:
+        # Arithmetic: full_adder4(a, adder_b, cin)
+        if sel == 0b00:
+            adder_b = 0x0
+        elif sel == 0b01:
+            adder_b = b
+        elif sel == 0b10:
+            adder_b = ~b & 0xF
+        else:
+            adder_b = 0xF
+        total = a + adder_b + cin
+        return total & 0xF, (total >> 4) & 1
+
+    # Logical: cout forced to 0
+    if sel == 0b00:
+        res = a | b
+    elif sel == 0b01:
+        res = a ^ b
+    elif sel == 0b10:
+        res = a & b
+    else:
+        res = ~a & 0xF
+    return res, 0
+
+# ------------------------------------------------------------
+# CPU model (one tick() == one posedge clk)
+# ------------------------------------------------------------
+class CPUEmulator:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Asserts reset_n: FSM to INIT, RAM and ALU registers cleared"""
+        self.state = ST_INIT
+        self.mem = [0] * 16
+        self.data_out = 0
+        self.f = 0
+        self.cout = 0
+        self.instruction = 0
+
+    def snapshot(self):
+        """Immutable copy of every register + RAM (one checkpoint)"""
+        return (self.state, tuple(self.mem), self.data_out, self.f, self.cout, self.instruction)
+
+    def restore(self, snap):
+        self.state, mem, self.data_out, self.f, self.cout, self.instruction = snap
+        self.mem = list(mem)
+
+    def decode(self):
+        """instruction_decoder output logic for the current state"""
+        opcode = get_opcode(self.instruction)
+        op1 = get_op1(self.instruction)
+        op2 = get_op2(self.instruction)
+
+        # Defaults
+        csn, rwn, addr, data_in = RAM_IDLE, RAM_READ, 0, 0
+        alu_en, alu_sel, alu_a, alu_b = 0, ALU_TRANSFER, 0, 0
+
+        if self.state == ST_FETCH:
+            csn, rwn, addr = RAM_ACTIVE, RAM_READ, op1
+        elif self.state == ST_EXEC:
+            csn, rwn, addr = RAM_ACTIVE, RAM_READ, op1
+            alu_en = 1
+            alu_b = op2
+            alu_a = 0 if opcode == OPC_STO else self.data_out
+            alu_sel = OPC_ALU_SEL.get(opcode, ALU_TRANSFER)
+        elif self.state == ST_STORE:
+            csn, rwn, addr, data_in = RAM_ACTIVE, RAM_WRITE, op1, self.f
+
+        return csn, rwn, addr, data_in, alu_en, alu_sel, alu_a, alu_b
+
+    def tick(self):
+        """Advances every register by one clock edge (non-blocking semantics)"""
+        csn, rwn, addr, data_in, alu_en, alu_sel, alu_a, alu_b = self.decode()
+
+        # ram16x4
+        if csn == RAM_ACTIVE:
+            if rwn == RAM_WRITE:
+                self.mem[addr] = data_in
+                self.data_out = 0
+            else:
+                self.data_out = self.mem[addr]
+        else:
+            self.data_out = 0
+
+        # reg_alu
+        if alu_en:
+            self.f, self.cout = alu_eval(alu_sel, alu_a, alu_b)
+
+        # FSM
+        if self.state == ST_STORE:
+            self.state = ST_FETCH
+        else:
+            self.state += 1
+
+# ------------------------------------------------------------
+# bridge_tb driver: yields the same lines vvp prints
+# ------------------------------------------------------------
+def run_program(words, injections=(), cpu=None, checkpoints=None, start_pc=0):
+    """
+    Runs `words` through the CPU the way bridge_tb does and yields
+    each [EXEC]/[INJECT]/[RAM]/[DONE] line.
+    `injections` is a list of (pc, addr, val) tuples (see simulator.write_injections).
+    If `checkpoints` is a list, checkpoints[pc] is set to the CPU state
+    before instruction pc (plus one final entry after the last one).
+    With start_pc > 0, `cpu` must already hold the state before start_pc.
+    """
+    if cpu is None:
+        cpu = CPUEmulator()
+    if start_pc == 0:
+        cpu.reset()
+        # reset_n is released on the second posedge, which already
+        # moves the FSM out of INIT (see simulation.vcd)
+        cpu.tick()
+    if checkpoints is not None:
+        del checkpoints[start_pc:]
+
+    for pc in range(start_pc, len(words)):
+        word = words[pc]
+        if checkpoints is not None:
+            checkpoints.append(cpu.snapshot())
+        cpu.instruction = word
+        dest = get_op1(word)
+        yield (f"[EXEC] PC:{pc} | Op:{OPC_STR.get(get_opcode(word), '???')} "
+               f"| Dest:{dest:x} | Src:{get_op2(word):x}")
+
+        # FETCH -> EXEC -> STORE -> FETCH
+        cpu.tick()
+        cpu.tick()
+        cpu.tick()
+
+        for inj_step, inj_addr, inj_val in injections:
+            if inj_step == pc:
+                cpu.mem[inj_addr & 0xF] = inj_val & 0xF
+                yield f"[INJECT] Step:{inj_step} RAM[{inj_addr:08x}]={inj_val:08x}"
+
+        yield f"[RAM] Addr:{dest:x} Val:{cpu.mem[dest]:x}"
+
+    if checkpoints is not None:
+        checkpoints.append(cpu.snapshot())
+    yield "[DONE]"
+
+def resume_program(words, injections, checkpoints, start_pc):
+    """
+    Re-runs from the checkpoint before start_pc (e.g. after adding an
+    injection at start_pc); earlier instructions are not re-executed.
+    checkpoints[start_pc:] are replaced with the new run's states.
+    """
+    cpu = CPUEmulator()
+    cpu.restore(checkpoints[start_pc])
+    return run_program(words, injections, cpu, checkpoints, start_pc)
+
+def read_memhex(path="program.hex"):
+    """Loads a $readmemh-style file into a word list"""
+    words = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("//", 1)[0].strip()
+            if not line:
+                continue
+            words.append(int(line, 16) & ((1 << INSTR_W) - 1))
+    return words
+
+def read_program(path="program.hex"):
+    """Loads a $readmemh file or a packed program image (assembler.write_image)"""
+    if is_image(path):
+        with ProgramImage.load(path) as image:
+            return list(image.words)
+    return read_memhex(path)
+
+# ------------------------------------------------------------
+# CLI Main entry
+# ------------------------------------------------------------
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "program.hex"
+    for line in run_program(read_program(path)):
+        print(line)
+
+__all__ = [
+    "CPUEmulator",
+    "alu_eval",
+    "run_program",
+    "resume_program",
+    "read_memhex",
+    "read_program",
+]
+
+if __name__ == "__main__":
+    main()
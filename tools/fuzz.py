@@ -0,0 +1,236 @@
+# ============================================================
+# 4-bit CPU Differential Fuzzer
+# ------------------------------------------------------------
+# Generates random valid programs from the OPC table, runs them
+# through the RTL (bridge_tb under vvp, one warm session per
+# worker process) and through a reference ISA model, and checks
+# that RAM[op1] matches after every instruction. Failing programs
+# are shrunk (instructions dropped, operands zeroed) before they
+# are reported.
+#
+# Program i is generated from random.Random(f"{seed}:{i}"), so a
+# run (or a single failing case) is reproducible from the seed.
+#
+# Usage:
+#   python3 fuzz.py --programs 10000 --seed 1 -j 8
+#   python3 fuzz.py --rtl emulator   (cycle model instead of vvp)
+# ============================================================
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from assembler import OPC, write_memhex
+from emulator import run_program
+from simulator import compile_sim, SimSession
+from tracestore import parse_event, EV_EXEC, EV_RAM
+
+# Opcode -> mnemonic (inverse of OPC)
+MNEMONIC = {opc: mnem for mnem, opc in OPC.items()}
+
+# ------------------------------------------------------------
+# Reference ISA model: RAM[op1] <- op(RAM[op1], op2)
+# ------------------------------------------------------------
+ISA = {
+    "STO": lambda a, b: b,
+    "ADD": lambda a, b: (a + b) & 0xF,
+    "SUB": lambda a, b: (a - b) & 0xF,
+    "AND": lambda a, b: a & b,
+    "OR":  lambda a, b: a | b,
+    "XOR": lambda a, b: a ^ b,
+    "NOT": lambda a, b: ~a & 0xF,
+}
+
+def reference_run(words):
+    """Yields (dest, value) after each instruction, from reset (all-zero RAM)"""
+    ram = [0] * 16
+    for word in words:
+        mnem = MNEMONIC[(word >> 8) & 0x7]
+        dest = (word >> 4) & 0xF
+        ram[dest] = ISA[mnem](ram[dest], word & 0xF)
+        yield dest, ram[dest]
+
+def disassemble(word):
+    mnem = MNEMONIC.get((word >> 8) & 0x7, "???")
+    if mnem == "NOT":
+        return f"NOT 0x{(word >> 4) & 0xF:X}"
+    return f"{mnem} 0x{(word >> 4) & 0xF:X} 0x{word & 0xF:X}"
+
+# ------------------------------------------------------------
+# Program generator (valid words only: NOT carries op2 = 0)
+# ------------------------------------------------------------
+def generate_program(seed, index, max_len):
+    rng = random.Random(f"{seed}:{index}")
+    opcodes = list(OPC.values())
+    words = []
+    for _ in range(rng.randint(1, max_len)):
+        opc = rng.choice(opcodes)
+        op2 = 0 if opc == OPC["NOT"] else rng.randrange(16)
+        words.append((opc << 8) | (rng.randrange(16) << 4) | op2)
+    return words
+
+# ------------------------------------------------------------
+# Worker process: one RTL target + workspace each
+# ------------------------------------------------------------
+_rtl = None
+_session = None
+_workspace = None
+
+def _init_worker(rtl, sim_exe, root_dir):
+    # root_dir (and every workspace in it) is removed by the parent
+    global _rtl, _session, _workspace
+    _rtl = rtl
+    _workspace = tempfile.mkdtemp(prefix="worker_", dir=root_dir)
+    if rtl == "icarus":
+        _session = SimSession(sim_exe, cwd=_workspace)
+
+def rtl_run(words):
+    """Simulator output lines for words on this worker's RTL target"""
+    if _rtl == "emulator":
+        return run_program(words)
+    hex_path = os.path.join(_workspace, "program.hex")
+    write_memhex([f"{w:03x}" for w in words], hex_path)
+    return _session.run(hex_path, os.path.join(_workspace, "no_injections.hex"))
+
+def compare(words):
+    """None if the RTL matches the reference after every instruction, else a description"""
+    expected = list(reference_run(words))
+    pc = -1
+    seen = 0
+    for line in rtl_run(words):
+        row = parse_event(line)
+        if row is None:
+            continue
+        kind, row_pc, op, addr, val = row
+        if kind == EV_EXEC:
+            pc = row_pc
+        elif kind == EV_RAM:
+            if pc >= len(expected):
+                return f"PC {pc}: RTL executed past the end of the program"
+            dest, ref = expected[pc]
+            if addr != dest or val != ref:
+                return (f"PC {pc} ({disassemble(words[pc])}): RTL RAM[{addr:X}]={val:X}, "
+                        f"reference RAM[{dest:X}]={ref:X}")
+            seen += 1
+    if seen != len(expected):
+        return f"RTL reported {seen} of {len(expected)} instructions"
+    return None
+
+# ------------------------------------------------------------
+# Shrinking (delta debugging over instructions, then operands)
+# ------------------------------------------------------------
+def shrink(words):
+    """Smallest program found that still fails compare()"""
+    chunk = len(words) // 2
+    while chunk >= 1:
+        i = 0
+        while i < len(words):
+            candidate = words[:i] + words[i + chunk:]
+            if candidate and compare(candidate):
+                words = candidate
+            else:
+                i += chunk
+        chunk //= 2
+
+    # Zero operands where the failure survives it
+    for i in range(len(words)):
+        for mask in (0x70F, 0x7F0, 0x700):
+            candidate = words[:i] + [words[i] & mask] + words[i + 1:]
+            if candidate[i] != words[i] and compare(candidate):
+                words = candidate
+    return words
+
+def fuzz_batch(seed, start, count, max_len):
+    """Checks programs [start, start+count); returns (programs, instructions, failures)"""
+    failures = []
+    instructions = 0
+    for index in range(start, start + count):
+        words = generate_program(seed, index, max_len)
+        instructions += len(words)
+        reason = compare(words)
+        if reason:
+            small = shrink(words)
+            failures.append({"index": index, "reason": reason, "program": words,
+                             "shrunk": small, "shrunk_reason": compare(small)})
+    return count, instructions, failures
+
+# ------------------------------------------------------------
+# CLI Main entry
+# ------------------------------------------------------------
+def report(failure, out_dir):
+    print(f"\n[MISMATCH] program {failure['index']}: {failure['reason']}")
+    print(f"  shrunk {len(failure['program'])} -> {len(failure['shrunk'])} instructions: "
+          f"{failure['shrunk_reason']}")
+    for word in failure["shrunk"]:
+        print(f"    {disassemble(word)}")
+    if out_dir:
+        path = os.path.join(out_dir, f"fuzz_{failure['index']}.asm")
+        with open(path, "w") as f:
+            f.write(f"; {failure['shrunk_reason']}\n")
+            f.write("\n".join(disassemble(w) for w in failure["shrunk"]) + "\n")
+        print(f"  written to '{path}'")
+
+def main():
+    parser = argparse.ArgumentParser(description="Differential fuzzing: RTL vs reference ISA model")
+    parser.add_argument("--programs", type=int, default=1000, help="number of random programs")
+    parser.add_argument("--seed", type=int, default=1, help="run seed (program i uses seed:i)")
+    parser.add_argument("--max-len", type=int, default=64, help="max instructions per program")
+    parser.add_argument("--batch", type=int, default=100, help="programs per worker task")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--rtl", choices=("icarus", "emulator"), default="icarus",
+                        help="bridge_tb under vvp, or the cycle-accurate emulator")
+    parser.add_argument("--out", help="directory for shrunk failing programs (.asm)")
+    opts = parser.parse_args()
+
+    max_len = max(1, opts.max_len)
+    try:
+        sim_exe = compile_sim() if opts.rtl == "icarus" else None
+    except subprocess.CalledProcessError as e:
+        print(e.stderr.decode() if e.stderr else str(e))
+        sys.exit(1)
+    except FileNotFoundError:
+        print("Icarus Verilog (iverilog/vvp) not found in PATH.")
+        sys.exit(1)
+    if opts.out:
+        os.makedirs(opts.out, exist_ok=True)
+
+    print(f"Fuzzing {opts.programs} programs (seed {opts.seed}, max {max_len} instructions, rtl={opts.rtl})")
+    done = instructions = n_failures = 0
+    t0 = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix="cpu_fuzz_") as root_dir, \
+         ProcessPoolExecutor(max_workers=opts.jobs, initializer=_init_worker,
+                             initargs=(opts.rtl, sim_exe, root_dir)) as pool:
+        tasks = [pool.submit(fuzz_batch, opts.seed, start, min(opts.batch, opts.programs - start), max_len)
+                 for start in range(0, opts.programs, opts.batch)]
+        for task in as_completed(tasks):
+            count, n_instr, failures = task.result()
+            done += count
+            instructions += n_instr
+            for failure in failures:
+                n_failures += 1
+                report(failure, opts.out)
+            dt = time.perf_counter() - t0
+            print(f"\r[FUZZ] {done}/{opts.programs} programs, {n_failures} mismatches, "
+                  f"{done / dt:.1f} programs/s", end="", flush=True)
+
+    dt = time.perf_counter() - t0
+    print(f"\n{done} programs / {instructions} instructions in {dt:.2f} s "
+          f"({done / dt:.1f} programs/s, {instructions / dt:.0f} instr/s), {n_failures} mismatches")
+    sys.exit(1 if n_failures else 0)
+
+__all__ = [
+    "reference_run",
+    "generate_program",
+    "disassemble",
+    "compare",
+    "shrink",
+]
+
+if __name__ == "__main__":
+    main()
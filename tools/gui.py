@@ -2,8 +2,47 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 from PIL import Image
 import os
+import re
+import argparse
 import subprocess
-from assembler import assemble_text, write_memhex, OPC
+import tempfile
+import threading
+import queue
+import time
+from assembler import IncrementalAssembler, SourceMap, write_memhex, OPC
+from emulator import run_program, resume_program
+from simulator import compile_sim, SimSession, write_injections, dump_plusargs, DUMP_SCOPES
+from tracestore import Trace, RamTimeline, OP_NAMES, EV_EXEC, EV_RAM, EV_INJECT, EV_DONE
+from vcdindex import VCDIndex
+from simcache import ResultCache, result_key
+from debugger import StopConditions
+from consolebuf import ConsoleBuffer, CONSOLE_LINES, LOG_PATH, LEVEL_NAMES
+
+#Command Line Options
+parser = argparse.ArgumentParser(description="4-Bit-CPU GUI")
+parser.add_argument("--backend", choices=["python", "icarus"], default="python",
+                    help="simulation backend (python emulator or Icarus Verilog reference)")
+parser.add_argument("--rebuild", action="store_true",
+                    help="recompile cpu_sim on the first Icarus run, ignoring the compile cache")
+parser.add_argument("--sim-log", action="store_true",
+                    help="also write raw Icarus output to simulation.log")
+parser.add_argument("--no-cache", action="store_true",
+                    help="always re-simulate (skip the Icarus result cache)")
+parser.add_argument("--console-lines", type=int, default=CONSOLE_LINES,
+                    help="console lines kept on screen; older output goes to the console log")
+parser.add_argument("--console-log", default=LOG_PATH,
+                    help="file console lines pushed out of the buffer are appended to (rotated when large)")
+parser.add_argument("--console-level", choices=LEVEL_NAMES, default="trace",
+                    help="lowest message level shown in the console")
+parser.add_argument("--wave-scope", choices=DUMP_SCOPES, default="tb",
+                    help="hierarchy dumped by the Wave button (tb, cpu, decoder, alu, ram)")
+parser.add_argument("--wave-depth", type=int, default=0,
+                    help="levels below the wave scope to dump (0 = all)")
+parser.add_argument("--wave-start", type=int, default=None,
+                    help="start of the dumped time window (ns)")
+parser.add_argument("--wave-stop", type=int, default=None,
+                    help="end of the dumped time window (ns)")
+args = parser.parse_args()
 
 #GUI Window Title
 root = tk.Tk()
@@ -63,109 +102,321 @@ current_file = None
 # -------------------------------------
 # SIMULATION STATE
 # -------------------------------------
-execution_trace = []  # List of steps parsed from log
+execution_trace = Trace()  # Columnar event trace parsed from the simulator output
 current_step = 0      # Index of the next step to execute
+timeline = RamTimeline(execution_trace)  # RAM snapshots for seeking in execution_trace
+timeline_sync = False  # Set while the timeline slider is moved by code
+breakpoint_lines = set()  # Editor lines with a breakpoint (toggled in the line number bar)
+break_row = None      # Trace row Continue last stopped at on a breakpoint (stepped over next time)
 ram_injections = []    # Stores {address: value} for manual writes
+sim_backend = args.backend  # "python" (emulator.py) or "icarus" (iverilog/vvp)
+force_rebuild = args.rebuild  # Bypass the cpu_sim compile cache once
+sim_session = None  # Resident `vvp cpu_sim +server` process (icarus backend)
+emu_words = []        # Program run by the emulator backend
+emu_checkpoints = []  # emu_checkpoints[pc] = CPU state before instruction pc (emulator backend)
+asm_cache = IncrementalAssembler()  # Per-line assembly cache, kept current while typing
+written_hex = None    # hex_lines last written to program.hex
+program_map = SourceMap()  # PC <-> editor line of the program being simulated
+exec_line_no = None   # Editor line currently tagged exec_line
+trace_job = None      # SimJob whose trace is loaded (program + map for re-runs)
+sim_cache = None if args.no_cache else ResultCache()  # Icarus traces by program/injections/RTL (worker thread)
 
 # ============================================================
 # SIMULATION ENGINE
 # ============================================================
 
-def run_verilog_process():
+def build_sim(log):
+    """Worker thread: compiles cpu_sim (cached, see simulator.py) and returns its path"""
+    global force_rebuild
+    sim_exe = compile_sim(force=force_rebuild, log=log)
+    force_rebuild = False
+    return sim_exe
+
+def open_sim_session(log):
     """
-    Directly runs iverilog/vvp using hardcoded paths.
+    Worker thread: compiles cpu_sim and returns the warm vvp session,
+    restarting it if cpu_sim was rebuilt.
+    Raises CalledProcessError / FileNotFoundError like compile_sim.
     """
-    sim_exe = "cpu_sim"
-    log_file = "simulation.log"
-    
-    # 1. Define source files with correct relative paths from 'tools/'
-    sources = [
-        "../testbench/bridge_tb.v",                # Local testbench
-        "../src/cpu_top.v",
-        "../src/decoder_fsm.v",
-        "../src/ram16x4.v",
-        "../src/reg_alu4.v",
-        "../src/full_adder4.v",
-        "../src/full_adder1.v",
-        "../src/xor_gate.v"
-    ]
+    global sim_session
+
+    sim_exe = build_sim(log)
+
+    if sim_session is None or sim_session.is_stale():
+        if sim_session is not None:
+            sim_session.close()
+        sim_session = SimSession(sim_exe)
+        log("[SIM] Starting vvp session...")
+    return sim_session
+
+# ------------------------------------------------------------
+# SIMULATION WORKER
+# Jobs (compile + vvp, or the emulator) run one at a time on a
+# worker thread that only parses output; parsed events come back
+# through sim_events, which the Tk thread drains with root.after.
+# Editing is never blocked and further jobs queue up behind.
+# ------------------------------------------------------------
+SIM_POLL_MS = 30   # GUI refresh period while a job is pending
+SIM_BATCH = 500    # Max control events (start/log/error/done) applied per refresh
+SIM_BUDGET_S = 0.015    # Per-refresh time budget for draining sim_events
+SIM_CHUNK_ROWS = 8192   # Worker posts parsed rows as Trace chunks of up to this many rows
+SIM_CHUNK_S = 0.02      # ... or whatever it has after this long
+LARGE_PROGRAM = 100000  # Warn above this many instructions (trace + checkpoints stay in memory)
+
+class SimJob:
+    def __init__(self, name, words, hex_lines, injections, live=False, on_done=None, plusargs=None):
+        self.name = name
+        self.backend = "icarus" if plusargs else sim_backend
+        self.plusargs = plusargs  # One-shot vvp run with these (e.g. dump_plusargs)
+        self.words = list(words)
+        self.hex_lines = list(hex_lines)
+        self.injections = list(injections)
+        self.source_map = asm_cache.source_map
+        self.live = live          # Replay events into the GUI as they arrive
+        self.on_done = on_done    # Tk thread, called with the job on success
+        self.trace = Trace()      # Filled by the Tk thread from sim_events
+        self.checkpoints = []     # Emulator backend: CPU state before each pc
+        self.index_wave = False   # Worker indexes simulation.vcd into self.wave after the run
+        self.wave_signals = None  # Signals the panel shows (their change arrays are built too)
+        self.cache_key = None     # Worker: simcache key when the result may be cached
+        self.wave = None
+        self.cancelled = False
+        self.failed = False
+
+sim_jobs = queue.Queue()      # Tk -> worker (SimJob, None = exit)
+sim_events = queue.Queue()    # Worker -> Tk: (job, kind, data)
+sim_pending = []              # Submitted jobs not finished yet (Tk thread)
+sim_worker = None             # Worker thread, started on first submit
+sim_poll_job = None           # Pending root.after id
+
+def job_output(job, workdir, post):
+    """
+    Worker thread: yields the simulator output lines for job. Icarus
+    inputs are written to the job's own workdir, never to the
+    program.hex / injections.hex the Tk thread keeps in tools/.
+    """
+    if job.backend == "python":
+        return run_program(job.words, job.injections, checkpoints=job.checkpoints)
+
+    hex_path = os.path.join(workdir, "program.hex")
+    inj_path = os.path.join(workdir, "injections.hex")
+    write_memhex(job.hex_lines, hex_path)
+    if job.injections:
+        write_injections(job.injections, inj_path)
+
+    if job.plusargs:
+        # bridge_tb one-shot mode reads program.hex / injections.hex from its cwd
+        sim_exe = build_sim(lambda msg: post("log", msg))
+        result = subprocess.run(["vvp", sim_exe, *job.plusargs], cwd=workdir,
+                                capture_output=True, check=True)
+        return result.stdout.decode().splitlines()
+
+    session = open_sim_session(lambda msg: post("log", msg))
+    return session.stream(hex_path, inj_path)
+
+def cached_trace(job):
+    """
+    Worker thread: the cached trace of an identical Icarus run, or None.
+    Sets job.cache_key when the job's result may be stored.
+    Emulator runs are not cached (they are cheap and need checkpoints),
+    nor are waveform runs (their product is simulation.vcd).
+    """
+    if sim_cache is None or job.backend != "icarus" or job.plusargs or force_rebuild:
+        return None
+    job.cache_key = result_key(job.backend, job.words, job.injections)
+    return sim_cache.get(job.cache_key)
 
-    try:
-        # A. COMPILE
-        cmd_compile = ["iverilog", "-o", sim_exe, "-I", "../src"] + sources
-        subprocess.run(cmd_compile, check=True, capture_output=True)
+def sim_worker_main():
+    """Worker thread: runs queued jobs and posts their events. No Tk calls here."""
+    while True:
+        job = sim_jobs.get()
+        if job is None:
+            return
 
-        # B. RUN & LOG
-        with open(log_file, "w") as outfile:
-            subprocess.run(["vvp", sim_exe], stdout=outfile, check=True)
-            
-        return True
+        def post(kind, data=None):
+            sim_events.put((job, kind, data))
 
-    except subprocess.CalledProcessError as e:
-        err_msg = e.stderr.decode() if e.stderr else str(e)
-        messagebox.showerror("Simulation Error", f"Verilog failed:\n{err_msg}")
-        console_write(f"[SIM ERROR] {err_msg}")
-        return False
-    except FileNotFoundError:
-        messagebox.showerror("Config Error", "Icarus Verilog (iverilog) not found in PATH.")
-        return False
+        log = open("simulation.log", "w") if args.sim_log and job.backend == "icarus" else None
+        try:
+            cached = None if job.cancelled else cached_trace(job)
+            if cached is not None:
+                post("trace", cached)
+                post("start")
+                post("log", f"[CACHE] HIT  trace ({len(cached)} events, {job.cache_key[:12]})")
+            elif not job.cancelled:
+                post("start")
+                trace = Trace() if job.cache_key else None
+                chunk = Trace()
+                flushed = time.monotonic()
+
+                def post_chunk():
+                    # Rows go out as one columnar chunk (one queue item, bulk-extended on the Tk side)
+                    nonlocal chunk, flushed
+                    post("rows", chunk)
+                    if trace is not None:
+                        trace.extend(chunk)
+                    last_pc = chunk.last_pc
+                    chunk = Trace()
+                    chunk.last_pc = last_pc   # RAM rows at the start take the previous EXEC's pc
+                    flushed = time.monotonic()
+
+                with tempfile.TemporaryDirectory(prefix="cpu_job_") as workdir:
+                    for line in job_output(job, workdir, post):
+                        if log:
+                            log.write(line + "\n")
+                        chunk.append_line(line)
+                        if len(chunk) >= SIM_CHUNK_ROWS or (len(chunk) and time.monotonic() - flushed >= SIM_CHUNK_S):
+                            post_chunk()
+                        if job.cancelled:
+                            break
+                if len(chunk) and not job.cancelled:
+                    post_chunk()
+                if trace is not None and not job.cancelled:
+                    sim_cache.put(job.cache_key, trace)
+                if job.index_wave and not job.cancelled:
+                    job.wave = VCDIndex("simulation.vcd")
+                    job.wave.index_signals(wave_defaults(job.wave, job.wave_signals))
+        except subprocess.CalledProcessError as e:
+            post("error", e.stderr.decode() if e.stderr else str(e))
+        except FileNotFoundError:
+            post("error", "Icarus Verilog (iverilog/vvp) not found in PATH.")
+        except Exception as e:
+            post("error", str(e))
+        finally:
+            if log:
+                log.close()
+            post("done")
+
+def submit_sim_job(job):
+    """Queues a job behind any running one; returns its position in the queue"""
+    global sim_worker, sim_poll_job
+    if sim_worker is None:
+        sim_worker = threading.Thread(target=sim_worker_main, daemon=True)
+        sim_worker.start()
+
+    sim_pending.append(job)
+    sim_jobs.put(job)
+    if sim_poll_job is None:
+        sim_poll_job = root.after(SIM_POLL_MS, poll_sim_events)
+    update_sim_status()
+    return len(sim_pending) - 1
+
+def flush_live(job):
+    """Shows the events a live job added since the last flush as one GUI update"""
+    global current_step
+    if job.live and execution_trace is job.trace and current_step < len(job.trace):
+        replay_range(current_step, len(job.trace))
+        current_step = len(job.trace)
+
+def poll_sim_events():
+    """
+    Tk thread: drains worker events until the queue is empty or
+    SIM_BUDGET_S is used up, then reschedules. Row chunks only count
+    against the time budget; SIM_BATCH bounds the control events.
+    """
+    global sim_poll_job
+    sim_poll_job = None
 
-def process_simulation_log():
-    """Parses simulation.log into a structured trace for stepping"""
-    global execution_trace, current_step
-    
-    log_file = "simulation.log"
-    execution_trace = [] # Clear previous trace
-    current_step = 0     # Reset step counter
-    
-    if not os.path.exists(log_file):
-        return
+    deadline = time.monotonic() + SIM_BUDGET_S
+    control = 0
+    while control < SIM_BATCH and time.monotonic() < deadline:
+        try:
+            job, kind, data = sim_events.get_nowait()
+        except queue.Empty:
+            break
 
-    console_write("=== PARSING LOG ===")
-    
-    try:
-        with open(log_file, "r") as f:
-            for line in f:
-                line = line.strip()
-                
-                # PARSE [EXEC] EVENTS
-                # Format: [EXEC] PC:0 | Op:STO | Dest:7 | Src:2
-                if line.startswith("[EXEC]"):
-                    parts = line.split("|")
-                    step = {
-                        "type": "EXEC",
-                        "pc":   parts[0].split(":")[1].strip(),
-                        "op":   parts[1].split(":")[1].strip(),
-                        "dest": parts[2].split(":")[1].strip(),
-                        "src":  parts[3].split(":")[1].strip()
-                    }
-                    execution_trace.append(step)
-
-                # PARSE [RAM] EVENTS
-                # Format: [RAM] Addr:7 Val:2
-                elif line.startswith("[RAM]"):
-                    parts = line.split() 
-                    step = {
-                        "type": "RAM",
-                        "addr": int(parts[1].split(":")[1], 16),
-                        "val":  int(parts[2].split(":")[1], 16)
-                    }
-                    execution_trace.append(step)
-
-                elif line.startswith("[DONE]"):
-                    execution_trace.append({"type": "DONE"})
-                    console_write(f"[INFO] Simulation trace loaded: {len(execution_trace)} steps.")
+        if kind == "rows":
+            job.trace.extend(data)
+            continue
+        if kind == "trace":
+            job.trace = data   # Cache hit: the whole run at once
+            continue
+
+        control += 1
+
+        flush_live(job)
+        if kind == "start":
+            console_write(f"[SIM] {job.name} started ({job.backend}).")
+            if job.live:
+                install_trace(job)
+                console_write("=== EXECUTING ===")
+        elif kind == "log":
+            console_write(data)
+        elif kind == "error":
+            job.failed = True
+            if not job.cancelled:
+                messagebox.showerror("Simulation Error", f"Simulation failed:\n{data}")
+                console_write(f"[SIM ERROR] {data}")
+        elif kind == "done":
+            finish_sim_job(job)
+
+    if sim_pending:
+        flush_live(sim_pending[0])
+    update_sim_status()
+    if sim_pending or not sim_events.empty():
+        sim_poll_job = root.after(SIM_POLL_MS, poll_sim_events)
+
+def finish_sim_job(job):
+    """Tk thread: a job's worker output is complete"""
+    global emu_words, emu_checkpoints, current_step
+    sim_pending.remove(job)
+
+    if job.cancelled:
+        console_write(f"[STOP] {job.name} cancelled.")
+        return
+    if job.failed:
+        return
 
-    except Exception as e:
-        console_write(f"[LOG ERROR] Could not read log: {e}")
+    if job.backend == "python":
+        emu_words, emu_checkpoints = job.words, job.checkpoints
+    console_write(f"[INFO] Simulation trace loaded: {len(job.trace)} steps.")
+    if job.live:
+        current_step = len(execution_trace)
+        console_write("[3/3] Execution Complete.")
+        update_timeline()
+    if job.on_done is not None:
+        job.on_done(job)
+
+def install_trace(job):
+    """Makes job's trace (and program) the one the stepper works on"""
+    global execution_trace, current_step, program_map, trace_job
+    stop_play()
+    execution_trace, trace_job = job.trace, job
+    program_map = job.source_map
+    current_step = 0
+
+def update_sim_status():
+    """Toolbar progress: current PC and events parsed for the running job"""
+    if not sim_pending:
+        sim_status.config(text="")
+        btn_stop.config(state="disabled")
+        return
+    job = sim_pending[0]
+    queued = f" (+{len(sim_pending) - 1} queued)" if len(sim_pending) > 1 else ""
+    sim_status.config(text=f"⏳ {job.name}: PC {job.trace.last_pc} · {len(job.trace)} events{queued}")
+    btn_stop.config(state="normal")
+
+def cmd_stop():
+    """Cancels the running and queued jobs, killing the vvp child"""
+    if not sim_pending:
+        return
+    for job in sim_pending:
+        job.cancelled = True
+    if sim_session is not None:
+        sim_session.kill()   # The next job restarts vvp
+    console_write("[CMD] Stopping simulation...")
+
+def sim_busy():
+    """True (and tells the user) while simulation jobs are pending"""
+    if sim_pending:
+        console_write("[BUSY] Simulation still running (Stop cancels it).")
+        return True
+    return False
 
 def save_injections_file():
-    """Writes user RAM edits to injections.txt for the testbench to read"""
+    """Writes user RAM edits to injections.hex for the testbench to preload"""
     try:
-        with open("injections.txt", "w") as f:
-            for step, addr, val in ram_injections:
-                # Format: STEP_INDEX ADDRESS VALUE (in hex)
-                f.write(f"{step} {addr:x} {val:x}\n")
+        write_injections(ram_injections, "injections.hex")
     except Exception as e:
         console_write(f"[ERROR] Saving injections: {e}")
 
@@ -190,12 +441,47 @@ def new_file():
     update_title()
 
 #Console Output Helper
-def console_write(msg):
+# Messages are buffered (consolebuf.ConsoleBuffer) and drawn once
+# per frame: one insert, plus one delete when the ring is full.
+CONSOLE_FLUSH_MS = 33
+console_buf = ConsoleBuffer(args.console_lines, args.console_log, LEVEL_NAMES.index(args.console_level))
+console_flush_job = None   # Pending root.after id
+
+def console_write(msg, level=None):
+    console_buf.write(msg, level)
+    schedule_console_flush()
+
+def console_write_lines(lines):
+    """Appends many lines (drawn with the next flush)"""
+    if not lines:
+        return
+    console_buf.extend(lines)
+    schedule_console_flush()
+
+def schedule_console_flush():
+    global console_flush_job
+    if console_flush_job is None:
+        console_flush_job = root.after(CONSOLE_FLUSH_MS, flush_console)
+
+def flush_console():
+    """Applies the buffered console output to the widget"""
+    global console_flush_job
+    console_flush_job = None
+    text, drop = console_buf.take()
+    if not text and not drop:
+        return
     console.config(state="normal")
-    console.insert("end", msg + "\n")
+    if drop:
+        console.delete("1.0", f"{drop + 1}.0")
+    if text:
+        console.insert("end", text)
     console.see("end")
     console.config(state="disabled")
 
+def set_console_level(value):
+    console_buf.set_level(LEVEL_NAMES.index(value))
+    flush_console()
+
 #Open File Function
 def open_asm_file():
     global current_file
@@ -258,7 +544,35 @@ def save_asm_file_as():
     save_asm_file()
     update_title()
 
+def submit_wave_job(on_done, index_wave=False):
+    """Re-runs the loaded program with waveform dumping on; on_done gets the job"""
+    if trace_job is not None:
+        words, hex_lines = trace_job.words, trace_job.hex_lines
+    else:
+        words, hex_lines, errors = asm_cache.update(editor.get("1.0", "end-1c"))
+        if errors:
+            console_write("[ABORT] Fix assembly errors first.")
+            return
+
+    # vvp runs in the job's workdir: name the dump file explicitly
+    plusargs = dump_plusargs(args.wave_scope, args.wave_depth, args.wave_start, args.wave_stop,
+                             path=os.path.abspath("simulation.vcd"))
+    job = SimJob("Wave", words, hex_lines, ram_injections, on_done=on_done, plusargs=plusargs)
+    job.index_wave = index_wave
+    if index_wave and wave_panel is not None and wave_panel.winfo_exists():
+        job.wave_signals = list(wave_panel.shown)
+    submit_sim_job(job)
+    console_write(f"[TOOL] Re-running with waveform dumping ({' '.join(plusargs)})...")
+
 def cmd_open_gtkwave():
+    """Re-runs the loaded program with waveform dumping on, then opens GTKWave"""
+    submit_wave_job(open_gtkwave)
+
+def cmd_wave_panel():
+    """Re-runs the loaded program with waveform dumping on, then shows it in the panel"""
+    submit_wave_job(open_wave_panel, index_wave=True)
+
+def open_gtkwave(job=None):
     """Opens the simulation waveform in GTKWave"""
     vcd_file = "simulation.vcd"
     if not os.path.exists(vcd_file):
@@ -272,6 +586,251 @@ def cmd_open_gtkwave():
     except FileNotFoundError:
         messagebox.showerror("Error", "GTKWave not found in PATH.\nPlease install gtkwave.")
 
+# ------------------------------------------------------------
+# WAVEFORM PANEL
+# Draws the signals picked on the left for the visible time
+# window only (VCDIndex.window); changes landing on the same
+# pixel column are merged into one "busy" mark, so the number
+# of canvas items is bounded by the panel width.
+# Only indexed signals are drawn: the worker indexes the shown
+# ones with the dump, later picks are indexed on a helper thread,
+# so redraw never rescans the file (even above INDEX_ALL_MAX_BYTES).
+# ------------------------------------------------------------
+WAVE_NAME_W = 190    # Signal name column (px)
+WAVE_ROW_H = 26
+WAVE_TOP = 22        # Time ruler height
+WAVE_DEFAULT_SIGNALS = 8
+WAVE_HI = "#2ECC71"
+WAVE_X = "#E74C3C"
+WAVE_POLL_MS = 50    # Checks for a finished index_signals thread
+
+wave_panel = None    # Open WavePanel (or None)
+
+def wave_defaults(index, shown=None):
+    """Signals a panel shows for index: the still existing ones of shown, else the first few"""
+    keep = [n for n in shown or () if n in index.signals]
+    return keep or index.names()[:WAVE_DEFAULT_SIGNALS]
+
+def wave_hex(value):
+    """VCD binary value string -> hex text ('x' / 'z' when undefined)"""
+    if value is None:
+        return "?"
+    if all(c in "01" for c in value):
+        return f"{int(value, 2):X}"
+    return "z" if "z" in value else "x"
+
+class WavePanel(tk.Toplevel):
+    def __init__(self, master, index):
+        super().__init__(master, bg="#1E1E1E")
+        self.title("Waveform")
+        self.geometry("1000x420")
+        self.index = None
+        self.shown = []
+        self.t0 = 0
+        self.span = 1
+        self.cursor = None
+        self.redraw_job = None
+        self.indexing = None   # Thread running index.index_signals (or None)
+
+        side = tk.Frame(self, bg="#1E1E1E")
+        side.pack(side="left", fill="y")
+        self.signal_list = tk.Listbox(side, selectmode="extended", width=32, exportselection=False,
+                                      bg="#252526", fg="#DDDDDD", selectbackground="#3498db",
+                                      font=("Consolas", 10), relief="flat", bd=0)
+        self.signal_list.pack(side="top", fill="y", expand=True, padx=4, pady=4)
+        self.signal_list.bind("<<ListboxSelect>>", self.on_select)
+
+        bar = tk.Frame(side, bg="#1E1E1E")
+        bar.pack(side="bottom", fill="x", pady=4)
+        for text, command in (("+", lambda: self.zoom(0.5)), ("−", lambda: self.zoom(2.0)),
+                              ("Fit", self.fit)):
+            tk.Button(bar, text=text, width=4, bg="#3c3c3c", fg="white", relief="flat", bd=0,
+                      font=("Consolas", 11, "bold"), command=command).pack(side="left", padx=4)
+        self.info = tk.Label(bar, text="", bg="#1E1E1E", fg="#F0C674", font=("Consolas", 10))
+        self.info.pack(side="left", padx=6)
+
+        self.scroll = tk.Scrollbar(self, orient="horizontal", command=self.on_scroll)
+        self.scroll.pack(side="bottom", fill="x")
+        self.canvas = tk.Canvas(self, bg="#111111", highlightthickness=0)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.bind("<Configure>", self.schedule_redraw)
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<MouseWheel>", self.on_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.zoom(0.8))
+        self.canvas.bind("<Button-5>", lambda e: self.zoom(1.25))
+
+        self.load(index)
+
+    def load(self, index):
+        """Shows a new index, keeping the picked signals that still exist"""
+        self.shown = wave_defaults(index, self.shown)
+        self.index = index
+        self.signal_list.delete(0, "end")
+        names = index.names()
+        for name in names:
+            self.signal_list.insert("end", name)
+        for i, name in enumerate(names):
+            if name in self.shown:
+                self.signal_list.selection_set(i)
+        self.request_index()
+        self.fit()
+
+    def request_index(self):
+        """Indexes shown signals that are not yet indexed on a helper thread (never in redraw)"""
+        if self.indexing is not None:
+            return
+        missing = [n for n in self.shown if not self.index.signals[n].indexed]
+        if missing:
+            self.indexing = threading.Thread(target=self.index.index_signals, args=(missing,), daemon=True)
+            self.indexing.start()
+            self.after(WAVE_POLL_MS, self.poll_index)
+
+    def poll_index(self):
+        if self.indexing.is_alive():
+            self.after(WAVE_POLL_MS, self.poll_index)
+            return
+        self.indexing = None
+        self.schedule_redraw()
+        self.request_index()   # The selection may have changed meanwhile
+
+    # --------------------------------------------------------
+    def plot_width(self):
+        return max(1, self.canvas.winfo_width() - WAVE_NAME_W)
+
+    def to_x(self, t):
+        return WAVE_NAME_W + int((t - self.t0) * self.plot_width() / self.span)
+
+    def to_time(self, x):
+        return self.t0 + (x - WAVE_NAME_W) * self.span / self.plot_width()
+
+    def set_window(self, t0, span):
+        end = max(1, self.index.end_time)
+        self.span = int(max(1, min(span, end)))
+        self.t0 = int(max(0, min(t0, end - self.span)))
+        self.scroll.set(self.t0 / end, (self.t0 + self.span) / end)
+        self.schedule_redraw()
+
+    def fit(self):
+        self.set_window(0, self.index.end_time)
+
+    def zoom(self, factor):
+        centre = self.cursor if self.cursor is not None else self.t0 + self.span / 2
+        span = self.span * factor
+        self.set_window(centre - span / 2, span)
+
+    def on_scroll(self, action, amount, unit=None):
+        end = max(1, self.index.end_time)
+        if action == "moveto":
+            self.set_window(float(amount) * end, self.span)
+        else:
+            step = self.span if unit == "pages" else self.span / 10
+            self.set_window(self.t0 + int(amount) * step, self.span)
+
+    def on_wheel(self, event):
+        self.zoom(0.8 if event.delta > 0 else 1.25)
+
+    def on_select(self, event=None):
+        self.shown = [self.signal_list.get(i) for i in self.signal_list.curselection()]
+        self.request_index()
+        self.schedule_redraw()
+
+    def on_click(self, event):
+        if event.x >= WAVE_NAME_W:
+            self.cursor = int(self.to_time(event.x))
+            self.schedule_redraw()
+
+    # --------------------------------------------------------
+    def schedule_redraw(self, event=None):
+        if self.redraw_job is None:
+            self.redraw_job = self.after_idle(self.redraw)
+
+    def redraw(self):
+        self.redraw_job = None
+        c = self.canvas
+        c.delete("all")
+        width = c.winfo_width()
+        t1 = self.t0 + self.span
+
+        # Ruler
+        c.create_text(6, WAVE_TOP // 2, anchor="w", fill="#888", font=("Consolas", 9),
+                      text=f"{self.t0}..{t1} ({self.index.timescale})")
+        for k in range(1, 5):
+            x = WAVE_NAME_W + k * self.plot_width() // 5
+            c.create_line(x, WAVE_TOP - 4, x, WAVE_TOP, fill="#555")
+            c.create_text(x, 2, anchor="n", fill="#888", font=("Consolas", 9),
+                          text=str(int(self.to_time(x))))
+
+        # Only indexed signals are queried: the rest are being indexed (request_index)
+        ready = [n for n in self.shown if self.index.signals[n].indexed]
+        window = self.index.window(ready, self.t0, t1)
+        for row, name in enumerate(self.shown):
+            y = WAVE_TOP + row * WAVE_ROW_H
+            c.create_text(6, y + WAVE_ROW_H // 2, anchor="w", fill="#DDDDDD",
+                          font=("Consolas", 10), text=name.split(".", 1)[-1])
+            if name not in window:
+                c.create_text(WAVE_NAME_W + 6, y + WAVE_ROW_H // 2, anchor="w", fill="#888",
+                              font=("Consolas", 9), text="indexing…")
+                continue
+            start, changes = window[name]
+            self.draw_signal(y + 4, WAVE_ROW_H - 8, self.index.signals[name].width, start, changes, width)
+
+        if self.cursor is not None and self.t0 <= self.cursor <= t1:
+            x = self.to_x(self.cursor)
+            c.create_line(x, 0, x, WAVE_TOP + len(self.shown) * WAVE_ROW_H, fill="#F0C674", dash=(3, 2))
+            values = [wave_hex(self.index.value_at(n, self.cursor)) if n in window else "…"
+                      for n in self.shown[:6]]
+            self.info.config(text=f"@{self.cursor}: " + " ".join(values))
+        else:
+            self.info.config(text="")
+
+    def draw_signal(self, y, h, bits, value, changes, width):
+        """One row: level lines for 1-bit signals, hex-labelled buses for vectors"""
+        x = WAVE_NAME_W
+        i = 0
+        while i < len(changes):
+            # Every change on the pixel column of changes[i]: one mark
+            nx = max(x, self.to_x(changes[i][0]))
+            j = i + 1
+            while j < len(changes) and self.to_x(changes[j][0]) <= nx:
+                j += 1
+            self.draw_segment(x, nx, y, h, bits, value)
+            if j - i > 1:
+                self.canvas.create_rectangle(nx, y, nx + 1, y + h, outline=WAVE_HI, fill=WAVE_HI)
+            else:
+                self.canvas.create_line(nx, y, nx, y + h, fill="#888")
+            x, value, i = nx, changes[j - 1][1], j
+        self.draw_segment(x, width, y, h, bits, value)
+
+    def draw_segment(self, x0, x1, y, h, bits, value):
+        if x1 <= x0 or value is None:
+            return
+        c = self.canvas
+        undefined = any(ch in "xz" for ch in value)
+        colour = WAVE_X if undefined else WAVE_HI
+        if bits == 1 and not undefined:
+            level = y if value == "1" else y + h
+            c.create_line(x0, level, x1, level, fill=colour)
+            return
+        if bits == 1:
+            c.create_line(x0, y + h // 2, x1, y + h // 2, fill=colour)
+            return
+        c.create_line(x0, y, x1, y, fill=colour)
+        c.create_line(x0, y + h, x1, y + h, fill=colour)
+        text = wave_hex(value)
+        if x1 - x0 > 8 * len(text) + 4:
+            c.create_text((x0 + x1) // 2, y + h // 2, text=text, fill="#FFFFFF", font=("Consolas", 9))
+
+def open_wave_panel(job):
+    """Shows job's indexed waveform (built on the worker) in the panel"""
+    global wave_panel
+    if wave_panel is not None and wave_panel.winfo_exists():
+        wave_panel.load(job.wave)
+        wave_panel.lift()
+    else:
+        wave_panel = WavePanel(root, job.wave)
+    console_write(f"[TOOL] Waveform panel: {len(job.wave.signals)} signals, "
+                  f"0..{job.wave.end_time} {job.wave.timescale}.")
+
 #Clear RAM Table Button Function
 def cmd_clear_ram():
     global ram_overrides
@@ -283,108 +842,395 @@ def cmd_clear_ram():
 #Run button function
 def cmd_run():
     """Run Button Logic: Compile -> Run -> Parse -> Replay All"""
-    global current_step, ram_injections  # <--- NEW: Access global step counter
+    global ram_injections
 
+    stop_play()
     ram_injections = [] 
-    if os.path.exists("injections.txt"):
-        os.remove("injections.txt")
+    if os.path.exists("injections.hex"):
+        os.remove("injections.hex")
     
     code = editor.get("1.0", "end-1c")
     try:
-        # 1. Compile Assembly
-        words, hex_lines, errors = assemble_text(code)
+        # 1. Compile Assembly (already cached by the live diagnostics pass)
+        words, hex_lines, errors = asm_cache.update(code)
         if errors:
             console_write("[ABORT] Fix assembly errors first.")
             for e in errors: console_write(f"[ASM ERROR] {e}")
             messagebox.showerror("Error", "Fix assembly errors first.")
             return
         
-        write_memhex(hex_lines, "program.hex")
+        write_program_hex(hex_lines)
         console_write("[1/3] Assembly Compiled.")
-
-        # 2. Run Simulation
-        if run_verilog_process():
-            console_write("[2/3] Verilog Simulation Finished.")
-            
-            # 3. Parse Log (Fills execution_trace list)
-            process_simulation_log()
-            
-            # 4. NEW: Replay ALL steps to update GUI to final state
-            console_write("=== EXECUTING ===")
-            for step in execution_trace:
-                execute_step(step)
-                
-            # 5. NEW: Set stepper to the end
-            current_step = len(execution_trace)
-            console_write("[3/3] Execution Complete.")
+        if len(words) > LARGE_PROGRAM:
+            console_write(f"[WARN] {len(words)} instructions: the GUI keeps the whole trace in memory "
+                          f"(runner.py simulates large programs headless).")
+
+        # 2. Simulate on the worker; events replay into the GUI as they arrive
+        ahead = submit_sim_job(SimJob("Run", words, hex_lines, ram_injections, live=True))
+        if ahead:
+            console_write(f"[2/3] Simulation queued ({ahead} job(s) ahead).")
+        else:
+            console_write(f"[2/3] Simulation started ({sim_backend}).")
             
     except Exception as e:
         console_write(f"[CRITICAL] {e}")
         messagebox.showerror("Runtime Error", str(e))
 
 def highlight_execution_line(pc_val):
-    """Maps the PC value to the text editor line and highlights it"""
-    # 1. Get all text from editor
-    content = editor.get("1.0", "end").splitlines()
-    
-    valid_ins_count = 0
-    target_line_idx = -1
-
-    # 2. Scan lines to find the Nth instruction (matching PC)
-    for idx, line in enumerate(content):
-        # Strip comments and whitespace (same logic as assembler)
-        # We assume import re exists at top
-        clean_line = line.split(";")[0].split("//")[0].strip()
-        
-        if clean_line:
-            # If this line has code, it counts towards the PC
-            if valid_ins_count == pc_val:
-                target_line_idx = idx + 1 # Tkinter lines are 1-based
-                break
-            valid_ins_count += 1
-
-    # 3. Apply Visual Highlight
-    editor.tag_remove("exec_line", "1.0", "end") # Clear old
-    
-    if target_line_idx != -1:
-        start = f"{target_line_idx}.0"
-        end   = f"{target_line_idx+1}.0"
-        editor.tag_add("exec_line", start, end)
+    """Maps the PC value to its editor line (program_map) and highlights it"""
+    global exec_line_no
+    if exec_line_no is not None:
+        editor.tag_remove("exec_line", f"{exec_line_no}.0", f"{exec_line_no + 1}.0")
+
+    exec_line_no = program_map.line_of(pc_val)
+    if exec_line_no is not None:
+        start = f"{exec_line_no}.0"
+        editor.tag_add("exec_line", start, f"{exec_line_no + 1}.0")
         editor.see(start) # Auto-scroll to keep line in view
 
-def execute_step(step):
-    """Updates GUI based on a single step event"""
-    if step["type"] == "EXEC":
-        # Log the executed instruction
-        msg = f"[PC {step['pc']}] {step['op']} {step['dest']}, {step['src']}"
-        console_write(msg)
-        
+def clear_execution_line():
+    global exec_line_no
+    editor.tag_remove("exec_line", "1.0", "end")
+    exec_line_no = None
+
+def goto_line(n):
+    """Moves the cursor to editor line n and scrolls it into view"""
+    editor.mark_set("insert", f"{n}.0")
+    editor.see(f"{n}.0")
+    editor.focus_set()
+
+def goto_first_error(event=None):
+    """Error navigation: jump to the first line the assembler rejected"""
+    if asm_cache.error_lines:
+        goto_line(asm_cache.error_lines[0])
+
+# Console colours for RAM cells written by the CPU / by an injection
+RAM_FG = {EV_RAM: "#00FF00", EV_INJECT: "#FFAA00"}
+
+def step_text(i):
+    """Console transcript line for trace event i (None if it prints nothing)"""
+    kind = execution_trace.kind[i]
+    if kind == EV_EXEC:
+        return (f"[PC {execution_trace.pc[i]}] {OP_NAMES[execution_trace.op[i]]} "
+                f"{execution_trace.addr[i]:x}, {execution_trace.val[i]:x}")
+    if kind == EV_RAM:
+        return f"    └── RAM[{execution_trace.addr[i]:X}] updated to {execution_trace.val[i]:X}"
+    if kind == EV_INJECT:
+        return f"    └── RAM[{execution_trace.addr[i]:X}] injected {execution_trace.val[i]:X}"
+    if kind == EV_DONE:
+        return "[STOP] Program Halted."
+    return None
+
+def execute_step(i):
+    """Updates GUI based on the trace event at index i"""
+    kind = execution_trace.kind[i]
+    text = step_text(i)
+    if text is not None:
+        console_write(text)
+
+    if kind == EV_EXEC:
         # --- NEW: Highlight the line in editor ---
-        try:
-            pc_int = int(step['pc'])
-            highlight_execution_line(pc_int)
-        except:
-            pass
+        highlight_execution_line(execution_trace.pc[i])
         
-    elif step["type"] == "RAM":
-        # Update RAM Table Visuals
-        addr = step["addr"]
-        val  = step["val"]
-        ram_cells[addr].config(text=f"{val:X}", fg="#00FF00") 
-        console_write(f"    └── RAM[{addr:X}] updated to {val:X}")
-        
-    elif step["type"] == "DONE":
-        console_write("[STOP] Program Halted.")
-        # Optional: Remove highlight on finish
-        # editor.tag_remove("exec_line", "1.0", "end")
-        
-    elif step["type"] == "DONE":
-        console_write("[STOP] Program Halted.")
+    elif kind in RAM_FG:
+        # Update RAM Table Visuals (orange = manual write applied by the simulator)
+        ram_cells[execution_trace.addr[i]].config(text=f"{execution_trace.val[i]:X}", fg=RAM_FG[kind])
+
+def replay_range(start, end):
+    """
+    Applies trace events [start, end) as one coalesced GUI update: the
+    final value/colour of each touched RAM cell, the last EXEC highlight
+    and one bulk console insert. Tk work does not grow with the range.
+    """
+    cells = {}      # addr -> (value, colour) after the last write
+    last_pc = None
+    lines = []
+    kind_col, addr_col, val_col = execution_trace.kind, execution_trace.addr, execution_trace.val
+
+    for i in range(start, end):
+        kind = kind_col[i]
+        if kind == EV_EXEC:
+            last_pc = execution_trace.pc[i]
+        elif kind in RAM_FG:
+            cells[addr_col[i]] = (val_col[i], RAM_FG[kind])
+        text = step_text(i)
+        if text is not None:
+            lines.append(text)
+
+    for addr, (val, fg) in cells.items():
+        text = f"{val:X}"
+        if ram_cells[addr].cget("text") != text or ram_cells[addr].cget("fg") != fg:
+            ram_cells[addr].config(text=text, fg=fg)
+    if last_pc is not None:
+        highlight_execution_line(last_pc)
+    console_write_lines(lines)
+
+def resume_emulator(pc):
+    """Re-executes the emulator from instruction pc onward, replacing the trace suffix"""
+    try:
+        execution_trace.truncate(execution_trace.exec_rows[pc])
+        current_timeline().truncate(len(execution_trace))
+        for line in resume_program(emu_words, ram_injections, emu_checkpoints, pc):
+            execution_trace.append_line(line)
+        console_write(f"[SIM] Resumed from checkpoint at PC={pc}.")
+    except Exception as e:
+        messagebox.showerror("Simulation Error", f"Emulator failed:\n{e}")
+        console_write(f"[SIM ERROR] {e}")
+
+def current_timeline():
+    """RamTimeline of execution_trace (rebuilt when another trace is loaded)"""
+    global timeline
+    if timeline.trace is not execution_trace:
+        timeline = RamTimeline(execution_trace)
+    return timeline
+
+def ram_state_at(k):
+    """RAM image after trace events [0, k): nearest snapshot + the rows after it"""
+    return current_timeline().ram_at(k)
+
+def render_ram(mem):
+    """Applies a RAM image to the table, touching only cells that changed"""
+    for addr, val in enumerate(mem):
+        text = f"{val:X}"
+        if ram_cells[addr].cget("text") != text:
+            ram_cells[addr].config(text=text, fg="#00FF00")
+
+def restore_position(k):
+    """Moves the stepper to trace index k and redraws the GUI state once"""
+    global current_step
+    current_step = k
+    render_ram(ram_state_at(k))
+
+    clear_execution_line()
+    done = current_timeline().steps_before(k)
+    if done:
+        highlight_execution_line(execution_trace.pc[execution_trace.exec_rows[done - 1]])
+    update_timeline()
+
+def seek_step(d):
+    """Jumps to the position after d instructions (one RAM table diff)"""
+    tl = current_timeline()
+    d = max(0, min(d, tl.step_count()))
+    restore_position(tl.step_row(d))
+    console_write(f"[SEEK] Step {d}/{tl.step_count()}")
+
+def cmd_step_back():
+    """Undoes the last executed instruction"""
+    stop_play()
+    if sim_busy() or not execution_trace:
+        return
+    done = current_timeline().steps_before(current_step)
+    if done == 0:
+        console_write("[INFO] Already at the start of the trace.")
+        return
+    seek_step(done - 1)
+
+def stop_conditions():
+    """Compiles the breakpoints (via the loaded trace's source map) + watch expressions, or None"""
+    conds = StopConditions()
+    for line in sorted(breakpoint_lines):
+        pc = program_map.pc_of(line)
+        if pc is None:
+            console_write(f"[WARN] Breakpoint on line {line} is not on an instruction.")
+        else:
+            conds.add_breakpoint(pc)
+    try:
+        conds.add_watches(watch_entry.get())
+    except ValueError as e:
+        messagebox.showerror("Invalid Watch", str(e))
+        return None
+    return conds
+
+def cmd_continue():
+    """Runs to the next breakpoint / watchpoint (or the end) and renders once"""
+    global break_row
+    stop_play()
+    if sim_busy():
+        return
+
+    if not execution_trace:
+        words, hex_lines, errors = asm_cache.update(editor.get("1.0", "end-1c"))
+        if errors:
+            console_write("[ABORT] Fix errors first.")
+            return
+        write_program_hex(hex_lines)
+        submit_sim_job(SimJob("Continue", words, hex_lines, ram_injections,
+                              on_done=lambda job: (install_trace(job), cmd_continue())))
+        return
+
+    conds = stop_conditions()
+    if conds is None:
+        return
+    start = current_step
+    if start >= len(execution_trace):
+        console_write("[INFO] Restarting simulation trace...")
+        start = 0
+    hit = conds.scan(execution_trace, start, ram_state_at(start) if conds.carry_mask else None,
+                     step_over=start == break_row)
+    break_row = None
+    if hit is None:
+        restore_position(len(execution_trace))
+        console_write("[INFO] No breakpoint or watchpoint hit; at the end of the trace.")
+        return
+    row, reason = hit
+    if reason.startswith("breakpoint"):
+        break_row = row
+    restore_position(row)
+    console_write(f"[BREAK] {reason} (step {current_timeline().steps_before(row)})")
+
+def toggle_breakpoint(event):
+    """Line number bar click: adds/removes a breakpoint on that editor line"""
+    line = int(editor.index(f"@0,{event.y}").split(".")[0])
+    if line in breakpoint_lines:
+        breakpoint_lines.discard(line)
+    else:
+        breakpoint_lines.add(line)
+    line_bar.update()
+
+def update_timeline():
+    """Syncs the timeline slider with the loaded trace and position"""
+    global timeline_sync
+    tl = current_timeline()
+    timeline_sync = True
+    try:
+        timeline_scale.config(to=max(tl.step_count(), 1))
+        timeline_scale.set(tl.steps_before(current_step) if current_step < len(execution_trace)
+                           else tl.step_count())
+    finally:
+        timeline_sync = False
+
+def on_timeline_move(value):
+    """Timeline slider dragged: seek to that step"""
+    if timeline_sync or sim_pending or not execution_trace:
+        return
+    stop_play()
+    d = int(float(value))
+    if d != current_timeline().steps_before(current_step) or current_step >= len(execution_trace):
+        seek_step(d)
+
+#-------------------------------------
+# Play mode (animated run through the loaded trace)
+#-------------------------------------
+# Stepping and drawing are decoupled: each frame advances by the
+# steps earned at the chosen rate since the last frame, then draws
+# the result once. At high rates the frame jumps via the timeline
+# snapshots instead of replaying every row into the GUI.
+PLAY_FRAME_MS = 33          # ~30 fps redraw
+PLAY_MAX_PER_FRAME = 5000   # Steps per frame at "max"
+PLAY_LOG_ROWS = 64          # Larger frames skip the per-row console transcript
+PLAY_RATES = ["1", "2", "5", "10", "20", "50", "100", "200", "500", "1000", "5000", "max"]
+
+play_job = None      # Pending root.after id while playing
+play_credit = 0.0    # Steps earned but not taken yet
+play_last = 0.0      # time.monotonic() of the last frame
+play_stop = None     # (row, reason) of the next breakpoint/watchpoint, or None
+
+def play_steps(now):
+    """Steps to take this frame at the selected rate"""
+    global play_credit, play_last
+    rate = play_rate.get()
+    elapsed, play_last = now - play_last, now
+    if rate == "max":
+        return PLAY_MAX_PER_FRAME
+    play_credit = min(play_credit + elapsed * int(rate), PLAY_MAX_PER_FRAME)
+    n = int(play_credit)
+    play_credit -= n
+    return n
+
+def play_frame():
+    """One animation frame: advance, draw once, reschedule"""
+    global play_job, current_step, break_row
+    play_job = None
+    n = play_steps(time.monotonic())
+    if n:
+        tl = current_timeline()
+        end = tl.step_row(tl.steps_before(current_step) + n)
+        if current_step < len(execution_trace) and execution_trace.kind[current_step] != EV_EXEC:
+            end = tl.step_row(tl.steps_before(current_step) + n - 1)   # Finish the started step first
+        if play_stop is not None:
+            end = min(end, play_stop[0])
+
+        if end - current_step <= PLAY_LOG_ROWS:
+            replay_range(current_step, end)
+            current_step = end
+            update_timeline()
+        else:
+            restore_position(end)
+
+        if play_stop is not None and end == play_stop[0]:
+            row, reason = play_stop
+            break_row = row if reason.startswith("breakpoint") else None
+            stop_play()
+            console_write(f"[BREAK] {reason} (step {tl.steps_before(row)})")
+            return
+        if end >= len(execution_trace):
+            stop_play()
+            console_write(f"[INFO] Play finished: {tl.step_count()} steps.")
+            return
+    play_job = root.after(PLAY_FRAME_MS, play_frame)
+
+def start_play():
+    """Begins playing from the current position (restarting at the end)"""
+    global play_stop, play_credit, play_last, break_row
+    conds = stop_conditions()
+    if conds is None:
+        return
+    if current_step >= len(execution_trace):
+        console_write("[INFO] Restarting simulation trace...")
+        restore_position(0)
+    play_stop = None
+    if conds:
+        play_stop = conds.scan(execution_trace, current_step,
+                               ram_state_at(current_step) if conds.carry_mask else None,
+                               step_over=current_step == break_row)
+    break_row = None
+
+    play_credit, play_last = 1.0, time.monotonic()   # First step shows right away
+    btn_play.config(text="⏸ Pause")
+    console_write(f"[PLAY] {play_rate.get()} steps/s from step {current_timeline().steps_before(current_step)}")
+    play_frame()
+
+def stop_play():
+    """Pauses Play mode (no-op when not playing)"""
+    global play_job
+    if play_job is not None:
+        root.after_cancel(play_job)
+        play_job = None
+    btn_play.config(text="▶ Play")
+
+def cmd_play():
+    """Play/Pause toggle"""
+    if play_job is not None:
+        stop_play()
+        console_write(f"[PAUSE] At step {current_timeline().steps_before(current_step)}.")
+        return
+    if sim_busy():
+        return
+
+    if not execution_trace:
+        words, hex_lines, errors = asm_cache.update(editor.get("1.0", "end-1c"))
+        if errors:
+            console_write("[ABORT] Fix errors first.")
+            return
+        write_program_hex(hex_lines)
+        submit_sim_job(SimJob("Play", words, hex_lines, ram_injections,
+                              on_done=lambda job: (install_trace(job), start_play())))
+        return
+    start_play()
+
+def start_stepping(job):
+    """Step job finished: load its trace and execute the first step"""
+    install_trace(job)
+    cmd_step()
 
 #Step instruction button function
 def cmd_step():
     """Executes the trace grouping EXEC+RAM into a single click"""
     global current_step, execution_trace
+
+    stop_play()
+    if sim_busy():
+        return
     
     # 1. AUTO-INITIALIZATION (Silent)
     # If trace is empty, we compile and run sim, but DO NOT replay all steps yet.
@@ -394,29 +1240,24 @@ def cmd_step():
         # A. Compile Assembly
         code = editor.get("1.0", "end-1c")
         try:
-            words, hex_lines, errors = assemble_text(code)
+            words, hex_lines, errors = asm_cache.update(code)
             if errors:
                 console_write("[ABORT] Fix errors first.")
                 return
-            write_memhex(hex_lines, "program.hex")
+            write_program_hex(hex_lines)
         except Exception as e:
             console_write(f"[ERROR] {e}")
             return
 
-        # B. Run Hardware Simulation
-        if not run_verilog_process(): 
-            return
-        
-        # C. Parse Log
-        process_simulation_log() 
-        current_step = 0
-        # Note: We do NOT return here. We proceed immediately to execute the first step.
+        # B. Run Simulation on the worker; the first step follows once it is loaded
+        submit_sim_job(SimJob("Step", words, hex_lines, ram_injections, on_done=start_stepping))
+        return
 
     # 2. RESTART LOGIC
     # If we reached the end previously, loop back to start
     if current_step >= len(execution_trace):
         console_write("[INFO] Restarting simulation trace...")
-        current_step = 0
+        restore_position(0)
         for lbl in ram_cells: lbl.config(fg="#FFFFFF") # Reset colors
 
     # 3. SMART STEP EXECUTION
@@ -424,20 +1265,29 @@ def cmd_step():
     if current_step < len(execution_trace):
         
         # Execute the main instruction event
-        execute_step(execution_trace[current_step])
+        execute_step(current_step)
         current_step += 1
         
         # Look ahead: If the next events are RAM updates (associated with this op), do them now.
         while current_step < len(execution_trace):
-            next_type = execution_trace[current_step]["type"]
+            next_type = execution_trace.kind[current_step]
             
             # Stop if we hit the next Instruction Start
-            if next_type == "EXEC":
+            if next_type == EV_EXEC:
                 break
             
             # Execute RAM updates or DONE messages immediately
-            execute_step(execution_trace[current_step])
+            execute_step(current_step)
             current_step += 1
+        update_timeline()
+
+def write_program_hex(hex_lines):
+    """Writes program.hex unless it already holds these words"""
+    global written_hex
+    if hex_lines == written_hex and os.path.exists("program.hex"):
+        return
+    write_memhex(hex_lines, "program.hex")
+    written_hex = list(hex_lines)
 
 #Assembly Code Compile Function
 def compile_program():
@@ -445,7 +1295,7 @@ def compile_program():
 
     try:
         # FIX: Unpack 3 values (words, hex, errors) instead of 2
-        words, hex_lines, errors = assemble_text(code)
+        words, hex_lines, errors = asm_cache.update(code)
 
         # 1. Check for Assembly Errors
         if errors:
@@ -456,13 +1306,17 @@ def compile_program():
             return # Stop here to prevent writing bad hex files
 
         # 2. Success Path
-        write_memhex(hex_lines, "program.hex")
+        write_program_hex(hex_lines)
         messagebox.showinfo("Compile Success", "Assembly compiled successfully!")
         console_write("=== COMPILE OUTPUT ===")
 
         for i, h in enumerate(hex_lines):
             console_write(f"{i:02d}: {h}")
 
+        stats = asm_cache.stats()
+        console_write(f"[ASM] Line cache: {stats['hit_rate']:.0%} hit rate, "
+                      f"{stats['time_spent'] * 1000:.1f} ms assembling")
+
     except Exception as e:
         messagebox.showerror("Compile Error", str(e))
         console_write("[CRITICAL ERROR] " + str(e))
@@ -482,67 +1336,112 @@ def setup_highlight_tags():
         editor.tag_configure("comment", foreground="#6A9955", font=("Consolas", 12, "italic"))
         # Dark Blue background for the active line
         editor.tag_configure("exec_line", background="#264f78")
+        # Dark red underline for lines the assembler rejects
+        editor.tag_configure("asm_error", background="#5A1D1D", underline=True)
     except:
         pass
 
+# One combined pattern per line; comments swallow the rest of the line
+TOKEN_RE = re.compile(
+    r"(?P<comment>(?:;|//).*)"
+    r"|(?P<opcode>\b(?:" + "|".join(OPC.keys()) + r")\b)"
+    r"|(?P<number>0x[0-9A-Fa-f]+|0b[01]+|\d+)",
+    re.IGNORECASE)
+HIGHLIGHT_TAGS = ("opcode", "number", "comment")
+HIGHLIGHT_DELAY_MS = 50   # Debounce: re-tag once typing pauses
+
+hl_dirty = set()     # Line numbers edited since the last pass
+hl_job = None        # Pending root.after id
+hl_line_count = 1    # Line count at the last keystroke (detects pastes/newlines)
+
+def highlight_line(n):
+    """Re-tags a single editor line from scratch"""
+    start, end = f"{n}.0", f"{n}.end"
+    for tag in HIGHLIGHT_TAGS:
+        editor.tag_remove(tag, start, end)
+    for m in TOKEN_RE.finditer(editor.get(start, end)):
+        editor.tag_add(m.lastgroup, f"{n}.{m.start()}", f"{n}.{m.end()}")
+
+def visible_lines():
+    first = int(editor.index("@0,0").split(".")[0])
+    last = int(editor.index(f"@0,{editor.winfo_height()}").split(".")[0])
+    return range(first, last + 1)
+
+def run_highlighting():
+    """Re-tags dirty lines plus the viewport; cost is independent of file length"""
+    global hl_job
+    hl_job = None
+    total = int(editor.index("end-1c").split(".")[0])
+    lines = {n for n in hl_dirty if n <= total}
+    lines.update(visible_lines())
+    hl_dirty.clear()
+    for n in sorted(lines):
+        highlight_line(n)
+
+def schedule_highlighting(event=None):
+    """Debounced run_highlighting()"""
+    global hl_job
+    if 'editor' not in globals():
+        return
+    if hl_job is not None:
+        root.after_cancel(hl_job)
+    hl_job = root.after(HIGHLIGHT_DELAY_MS, run_highlighting)
+
+def on_editor_key(event=None):
+    """Marks the line(s) around the cursor dirty (all pasted lines if the count grew)"""
+    global hl_line_count
+    cur = int(editor.index("insert").split(".")[0])
+    total = int(editor.index("end-1c").split(".")[0])
+    added = max(total - hl_line_count, 0)
+    hl_line_count = total
+    hl_dirty.update(range(max(1, cur - added - 1), cur + 2))
+    schedule_highlighting()
+    schedule_diagnostics()
+
+def on_editor_scroll(first, last):
+    """yscrollcommand: keep the scrollbar in sync and tag lines scrolled into view"""
+    editor_scroll.set(first, last)
+    schedule_highlighting()
+
 def apply_highlighting(event=None):
-    """Scan text and apply tags based on regex patterns"""
+    """Re-tags the visible lines right away (e.g. after loading a file)"""
+    global hl_line_count
     if 'editor' not in globals():
         return
+    hl_line_count = int(editor.index("end-1c").split(".")[0])
+    run_highlighting()
+    run_diagnostics()
 
-    # 1. Clear existing tags
-    for tag in ["opcode", "number", "comment"]:
-        editor.tag_remove(tag, "1.0", "end")
+# -------------------------------------
+# LIVE ASSEMBLY DIAGNOSTICS
+# -------------------------------------
+DIAG_DELAY_MS = 300   # Debounce: re-assemble once typing pauses
 
-    # 2. Highlight Opcodes (Keywords)
-    # Using \m (start of word) and \M (end of word) for Tcl regex boundaries
-    for opcode in OPC.keys():
-        start_idx = "1.0"
-        pattern = r"\m" + opcode + r"\M"
-        
-        while True:
-            # Search for pattern
-            start_idx = editor.search(pattern, start_idx, stopindex="end", count=tk.IntVar(), regexp=True, nocase=True)
-            if not start_idx:
-                break
-            
-            # Calculate end index based on opcode length
-            line, char = start_idx.split(".")
-            end_idx = f"{line}.{int(char) + len(opcode)}"
-            
-            editor.tag_add("opcode", start_idx, end_idx)
-            start_idx = end_idx
+diag_job = None      # Pending root.after id
 
-    # 3. Highlight Numbers (Hex 0x..., Bin 0b..., Decimal)
-    start_idx = "1.0"
-    while True:
-        count_var = tk.IntVar()
-        # Regex: 0x... OR 0b... OR digits
-        start_idx = editor.search(r"(0x[0-9A-Fa-f]+|0b[01]+|\d+)", start_idx, stopindex="end", count=count_var, regexp=True)
-        if not start_idx:
-            break
-        
-        length = count_var.get()
-        if length == 0: break
-        
-        end_idx = f"{start_idx}+{length}c"
-        editor.tag_add("number", start_idx, end_idx)
-        start_idx = end_idx
+def run_diagnostics():
+    """Re-assembles the editor through the line cache and marks rejected lines"""
+    global diag_job
+    diag_job = None
+    words, hex_lines, errors = asm_cache.update(editor.get("1.0", "end-1c"))
 
-    # 4. Highlight Comments (Starting with ; or //)
-    start_idx = "1.0"
-    while True:
-        count_var = tk.IntVar()
-        start_idx = editor.search(r"(;|//).*", start_idx, stopindex="end", count=count_var, regexp=True)
-        if not start_idx:
-            break
-            
-        length = count_var.get()
-        if length == 0: break
+    editor.tag_remove("asm_error", "1.0", "end")
+    for n in asm_cache.error_lines:
+        editor.tag_add("asm_error", f"{n}.0", f"{n}.end")
 
-        end_idx = f"{start_idx}+{length}c"
-        editor.tag_add("comment", start_idx, end_idx)
-        start_idx = end_idx
+    if errors:
+        diag_label.config(text=f"✖ {errors[0]}" + (f" (+{len(errors) - 1})" if len(errors) > 1 else ""),
+                          fg="#F48771")
+    else:
+        large = " (large: GUI keeps the whole trace)" if len(words) > LARGE_PROGRAM else ""
+        diag_label.config(text=f"✔ {len(words)} instr{large}", fg="#89D185")
+
+def schedule_diagnostics():
+    """Debounced run_diagnostics()"""
+    global diag_job
+    if diag_job is not None:
+        root.after_cancel(diag_job)
+    diag_job = root.after(DIAG_DELAY_MS, run_diagnostics)
 
 #-------------------------------------
 # GUI Buttons in the Toolbar
@@ -583,6 +1482,14 @@ btn_wave = tk.Button(toolbar, text="🌊 Wave", width=9, height=1,
                      command=cmd_open_gtkwave)
 btn_wave.pack(side="right", padx=6, pady=8)
 
+btn_wave_panel = tk.Button(toolbar, text="📈 Panel", width=9, height=1,
+                           bg="#3498db", fg="black",
+                           activebackground="#2980b9", activeforeground="white",
+                           font=("Consolas", 12, "bold"),
+                           relief="flat", bd=0,
+                           command=cmd_wave_panel)
+btn_wave_panel.pack(side="right", padx=6, pady=8)
+
 # RUN / STEP / COMPILE / CLEAR RAM buttons unchanged
 
 btn_compile = tk.Button(toolbar, text="Compile", width=9, height=1,
@@ -601,6 +1508,22 @@ btn_step = tk.Button(toolbar, text="⏭ Step", width=9, height=1,
                      command=cmd_step)
 btn_step.pack(side="right", padx=6, pady=8)
 
+btn_back = tk.Button(toolbar, text="⏮ Back", width=8, height=1,
+                     bg="#e67e22", fg="black",
+                     activebackground="#d35400", activeforeground="white",
+                     font=("Consolas", 12, "bold"),
+                     relief="flat", bd=0,
+                     command=cmd_step_back)
+btn_back.pack(side="right", padx=6, pady=8)
+
+btn_continue = tk.Button(toolbar, text="⏩ Cont", width=8, height=1,
+                         bg="#e67e22", fg="black",
+                         activebackground="#d35400", activeforeground="white",
+                         font=("Consolas", 12, "bold"),
+                         relief="flat", bd=0,
+                         command=cmd_continue)
+btn_continue.pack(side="right", padx=6, pady=8)
+
 btn_run = tk.Button(toolbar, text="▶ Run", width=9, height=1,
                     bg="#2ecc71", fg="black",
                     activebackground="#27ae60", activeforeground="white",
@@ -609,6 +1532,14 @@ btn_run = tk.Button(toolbar, text="▶ Run", width=9, height=1,
                     command=cmd_run)
 btn_run.pack(side="right", padx=6, pady=8)
 
+btn_stop = tk.Button(toolbar, text="■ Stop", width=7, height=1,
+                     bg="#e74c3c", fg="black",
+                     activebackground="#c0392b", activeforeground="white",
+                     font=("Consolas", 12, "bold"),
+                     relief="flat", bd=0, state="disabled",
+                     command=cmd_stop)
+btn_stop.pack(side="right", padx=6, pady=8)
+
 btn_clear_ram = tk.Button(toolbar, text="Clear RAM", width=9, height=1,
                           bg="#3c3c3c", fg="white",
                           activebackground="#555", activeforeground="white",
@@ -617,6 +1548,34 @@ btn_clear_ram = tk.Button(toolbar, text="Clear RAM", width=9, height=1,
                           command=cmd_clear_ram)
 btn_clear_ram.pack(side="right", padx=6, pady=8)
 
+#Simulation backend selector
+def set_backend(value):
+    global sim_backend, execution_trace, trace_job
+    stop_play()
+    sim_backend = value
+    execution_trace = Trace() # Force Step to re-simulate on the new backend
+    trace_job = None
+    console_write(f"[CMD] Simulation backend: {value}")
+
+backend_var = tk.StringVar(value=sim_backend)
+backend_menu = tk.OptionMenu(toolbar, backend_var, "python", "icarus", command=set_backend)
+backend_menu.config(width=7, bg="#3c3c3c", fg="white",
+                    activebackground="#555", activeforeground="white",
+                    font=("Consolas", 12, "bold"), relief="flat", bd=0,
+                    highlightthickness=0)
+backend_menu.pack(side="right", padx=6, pady=8)
+
+#Simulation job progress (running job PC / events, queue length)
+sim_status = tk.Label(toolbar, text="", bg="#1E1E1E", fg="#F0C674",
+                      font=("Consolas", 11))
+sim_status.pack(side="left", padx=10)
+
+#Live assembler status (first error, or instruction count)
+diag_label = tk.Label(toolbar, text="", anchor="w", bg="#1E1E1E", fg="#AAAAAA", cursor="hand2",
+                      font=("Consolas", 11))
+diag_label.pack(side="left", fill="x", expand=True, padx=10)
+diag_label.bind("<Button-1>", goto_first_error)
+
 #-------------------------------------
 # Editor + Console split area
 #-------------------------------------
@@ -658,6 +1617,8 @@ class LineNumbers(tk.Canvas):
             self.create_text(5, y, anchor="nw",
                              text=line_no, fill="#888",
                              font=("Consolas", 11))
+            if int(line_no) in breakpoint_lines:
+                self.create_oval(30, y + 5, 38, y + 13, fill="#E74C3C", outline="")
             i = self.text_widget.index(f"{i}+1line")
 
 line_bar = LineNumbers(
@@ -681,21 +1642,35 @@ editor = tk.Text(editor_area,
                  fg="#ffffff",
                  insertbackground="white",
                  selectbackground="#555555",
-                 yscrollcommand=editor_scroll.set)
+                 yscrollcommand=on_editor_scroll)
 editor.pack(side="left", fill="both", expand=True)
 
 setup_highlight_tags()
-editor.bind("<KeyRelease>", apply_highlighting, add="+")
+editor.bind("<KeyRelease>", on_editor_key, add="+")
 apply_highlighting()
 
 editor_scroll.config(command=editor.yview)
 line_bar.attach(editor)
 line_bar.update()
+line_bar.bind("<Button-1>", toggle_breakpoint)
 
 # -------------- CONSOLE AREA (bottom 35%) --------------
 console_frame = tk.Frame(left_side, bg="#000000")
 console_frame.pack(side="bottom", fill="x")
 
+console_bar = tk.Frame(console_frame, bg="#1E1E1E")
+console_bar.pack(side="top", fill="x")
+
+tk.Label(console_bar, text="Show:", fg="#AAAAAA",
+         bg="#1E1E1E", font=("Consolas", 10)).pack(side="left", padx=(6, 2))
+
+console_level = tk.StringVar(value=args.console_level)
+console_level_menu = tk.OptionMenu(console_bar, console_level, *LEVEL_NAMES, command=set_console_level)
+console_level_menu.config(bg="#3c3c3c", fg="white", activebackground="#555",
+                          activeforeground="white", highlightthickness=0,
+                          font=("Consolas", 10), relief="flat", bd=0)
+console_level_menu.pack(side="left")
+
 console_scroll = tk.Scrollbar(console_frame)
 console_scroll.pack(side="right", fill="y")
 
@@ -750,6 +1725,47 @@ for i in range(16):
 
     ram_cells.append(data_lbl)
 
+#Timeline: seek to any executed step (see RamTimeline)
+timeline_frame = tk.Frame(ram_frame, bg="#1E1E1E")
+timeline_frame.pack(fill="x", pady=(15, 0))
+
+tk.Label(timeline_frame, text="Timeline (step)", fg="white",
+         bg="#1E1E1E", font=("Consolas", 12, "bold")).pack()
+
+timeline_scale = tk.Scale(timeline_frame, from_=0, to=1, orient="horizontal",
+                          bg="#1E1E1E", fg="white", troughcolor="#2A2A2A",
+                          highlightthickness=0, font=("Consolas", 10),
+                          command=on_timeline_move)
+timeline_scale.pack(fill="x")
+
+tk.Label(timeline_frame, text="Watch (e.g. ram[3]==9; carry):", fg="#AAAAAA",
+         bg="#1E1E1E", font=("Consolas", 10)).pack(anchor="w", pady=(8, 0))
+watch_entry = tk.Entry(timeline_frame, font=("Consolas", 11),
+                       bg="#2A2A2A", fg="white", insertbackground="white",
+                       relief="solid", bd=1)
+watch_entry.pack(fill="x")
+
+play_bar = tk.Frame(timeline_frame, bg="#1E1E1E")
+play_bar.pack(fill="x", pady=(8, 0))
+
+btn_play = tk.Button(play_bar, text="▶ Play", width=9,
+                     bg="#2ecc71", fg="black",
+                     activebackground="#27ae60", activeforeground="white",
+                     font=("Consolas", 11, "bold"),
+                     relief="flat", bd=0,
+                     command=cmd_play)
+btn_play.pack(side="left")
+
+play_rate = tk.StringVar(value="10")
+play_rate_menu = tk.OptionMenu(play_bar, play_rate, *PLAY_RATES)
+play_rate_menu.config(bg="#3c3c3c", fg="white", activebackground="#555",
+                      activeforeground="white", highlightthickness=0,
+                      font=("Consolas", 10), relief="flat", bd=0)
+play_rate_menu.pack(side="left", padx=(6, 0))
+
+tk.Label(play_bar, text="steps/s", fg="#AAAAAA",
+         bg="#1E1E1E", font=("Consolas", 10)).pack(side="left", padx=4)
+
 write_panel = tk.Frame(ram_frame, bg="#1E1E1E")
 write_panel.pack(fill="x", pady=20)
 
@@ -801,6 +1817,10 @@ def write_to_ram():
     Injects a manual RAM value and re-simulates WITHOUT losing position.
     """
     global execution_trace, current_step, ram_injections
+
+    stop_play()
+    if sim_busy():
+        return
     
     # 1. Validation
     if not validate_hex_entry(addr_entry, 0xF):
@@ -817,14 +1837,8 @@ def write_to_ram():
     # We must attach this injection to the CURRENT PC so the Verilog knows WHEN to inject.
     target_pc = 0
     if execution_trace and current_step < len(execution_trace):
-        # Try to find the PC of the current step
-        item = execution_trace[current_step]
-        if item["type"] == "EXEC":
-            target_pc = int(item["pc"])
-        else:
-            # If currently on a RAM step, look back or assume same PC
-            # Defaulting to index logic if parsing fails
-            target_pc = int(execution_trace[current_step-1]["pc"]) if current_step > 0 else 0
+        # Every event row carries the PC of the instruction it belongs to
+        target_pc = execution_trace.pc[current_step]
     else:
         # If at start or end, inject at 0 or max
         target_pc = 0
@@ -835,23 +1849,31 @@ def write_to_ram():
 
     # 4. SAVE POSITION (The Fix!)
     old_step_index = current_step
+    was_at_end = current_step >= len(execution_trace)
+
+    # 6. RESTORE POSITION (from the nearest checkpoint, no replay)
+    def restore(job=None):
+        if job is not None:
+            install_trace(job)
+        restore_position(len(execution_trace) if was_at_end else min(old_step_index, len(execution_trace)))
+        console_write(f"=== RESTORED STATE TO STEP {current_step} ===")
 
     # 5. Re-Run Simulation
     save_injections_file()
-    if run_verilog_process():
-        process_simulation_log() # This resets current_step to 0
-        
-        # 6. RESTORE POSITION (Fast Forward)
-        console_write(f"=== RESTORING STATE TO STEP {old_step_index} ===")
-        
-        # Re-play everything up to where we were
-        # We assume the trace structure hasn't fundamentally changed
-        current_step = 0
-        while current_step < old_step_index and current_step < len(execution_trace):
-            execute_step(execution_trace[current_step])
-            current_step += 1
-            
-        console_write("=== RESTORE COMPLETE ===")
+    if sim_backend == "python" and execution_trace and target_pc + 1 < len(emu_checkpoints):
+        # Emulator: resume from the checkpoint before target_pc, keep the trace prefix
+        resume_emulator(target_pc)
+        restore()
+        return
+
+    if trace_job is not None:
+        words, hex_lines = trace_job.words, trace_job.hex_lines
+    else:
+        words, hex_lines, errors = asm_cache.update(editor.get("1.0", "end-1c"))
+        if errors:
+            console_write("[ABORT] Fix errors first.")
+            return
+    submit_sim_job(SimJob("Inject", words, hex_lines, ram_injections, on_done=restore))
 
 # Live validation while typing
 addr_entry.bind("<KeyRelease>", lambda e: validate_hex_entry(addr_entry))
@@ -873,4 +1895,18 @@ tk.Button(
     command=write_to_ram
 ).grid(row=3, column=0, columnspan=2, pady=10)
 
+#Shut down the resident simulator with the window
+def on_close():
+    stop_play()
+    for job in sim_pending:
+        job.cancelled = True
+    sim_jobs.put(None)
+    if sim_session is not None:
+        sim_session.kill()
+        sim_session.close()
+    console_buf.close()
+    root.destroy()
+
+root.protocol("WM_DELETE_WINDOW", on_close)
+
 root.mainloop()
\ No newline at end of file
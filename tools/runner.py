@@ -0,0 +1,247 @@
+# ============================================================
+# 4-bit CPU Headless Batch Runner
+# ------------------------------------------------------------
+# Assembles and simulates many .asm files in parallel and writes
+# one consolidated results file. Every worker process owns a
+# private temp workspace (program.hex, injections.hex and the
+# vvp session's simulation.vcd live there), so jobs never share
+# the fixed filenames the GUI uses in tools/.
+#
+# Expected images: for foo.asm, an optional foo.ram holds the 16
+# expected RAM nibbles (RAM[0]..RAM[F]) as hex digits; whitespace
+# is ignored and "x" marks a don't-care cell.
+#
+# Each result record carries "instructions" (EXEC events) and
+# "cycles": clock cycles of the run per the decoder FSM
+# (decoder_fsm.v), RESET_CYCLES for reset + INIT, then FETCH ->
+# EXEC -> STORE per instruction - the alignment simulation.vcd
+# shows. The summary totals both.
+#
+# Identical runs (same words, backend and RTL/emulator sources)
+# are answered from the simcache disk tier, shared by all workers.
+#
+# Usage:
+#   python3 runner.py tests/                     (every *.asm in a dir)
+#   python3 runner.py "progs/*.asm" -j 8 -o results.json
+#   python3 runner.py tests/ --backend python    (no Icarus needed)
+#   python3 runner.py tests/ --no-cache          (always re-simulate)
+# ============================================================
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+from assembler import assemble_file, write_memhex
+from emulator import run_program
+from simulator import compile_sim, SimSession
+from simcache import ResultCache, result_key, rtl_digest, CACHE_DIR
+from tracestore import Trace, EV_RAM, EV_INJECT
+
+# ------------------------------------------------------------
+# CONSTANTS
+# ------------------------------------------------------------
+EXPECT_SUFFIX = ".ram"
+RESET_CYCLES = 2        # Reset + INIT (decoder_fsm.v)
+CYCLES_PER_INSTR = 3    # FETCH -> EXEC -> STORE
+
+def cycle_count(instructions):
+    """Clock cycles of a run of `instructions` instructions (decoder FSM timing)"""
+    return RESET_CYCLES + CYCLES_PER_INSTR * instructions
+
+# ------------------------------------------------------------
+# Inputs
+# ------------------------------------------------------------
+def collect_sources(specs):
+    """Expands directories (*.asm inside), globs and plain paths, sorted and de-duplicated"""
+    paths = set()
+    for spec in specs:
+        if os.path.isdir(spec):
+            paths.update(glob.glob(os.path.join(spec, "*.asm")))
+        elif any(c in spec for c in "*?["):
+            paths.update(glob.glob(spec, recursive=True))
+        else:
+            paths.add(spec)
+    return sorted(paths)
+
+def read_expected(asm_path):
+    """Expected RAM image for asm_path (list of 16 ints / None), or None if absent"""
+    path = os.path.splitext(asm_path)[0] + EXPECT_SUFFIX
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        digits = "".join(f.read().split())
+    if len(digits) != 16:
+        raise ValueError(f"{path}: expected 16 RAM nibbles, got {len(digits)}")
+    return [None if d in "xX" else int(d, 16) for d in digits]
+
+# ------------------------------------------------------------
+# Simulator output -> final state
+# ------------------------------------------------------------
+def trace_state(trace):
+    """Returns (ram, instructions) after the run recorded in trace"""
+    ram = [0] * 16   # reset clears the RAM
+    for i in range(len(trace)):
+        if trace.kind[i] in (EV_RAM, EV_INJECT):
+            ram[trace.addr[i]] = trace.val[i]
+    return ram, len(trace.exec_rows)
+
+def final_state(lines):
+    """Returns (ram, instructions) after the run described by the output lines"""
+    return trace_state(Trace.from_lines(lines))
+
+# ------------------------------------------------------------
+# Worker process (one warm vvp session + workspace each)
+# ------------------------------------------------------------
+_backend = None
+_session = None
+_workspace = None
+_cache = None
+_digest = None
+
+def _init_worker(backend, sim_exe, root_dir, cache_dir, digest):
+    # vvp exits on stdin EOF when this process goes away;
+    # root_dir (and every workspace in it) is removed by run_all()
+    global _backend, _session, _workspace, _cache, _digest
+    _backend = backend
+    _workspace = tempfile.mkdtemp(prefix="worker_", dir=root_dir)
+    if backend == "icarus":
+        _session = SimSession(sim_exe, cwd=_workspace)
+    if cache_dir:
+        _cache, _digest = ResultCache(cache_dir), digest
+
+def run_job(asm_path):
+    """Assembles + simulates one file; returns its result record"""
+    result = {"file": asm_path, "status": "error", "ram": None, "cached": False,
+              "instructions": 0, "cycles": 0, "mismatch": [], "errors": []}
+    t0 = time.perf_counter()
+    try:
+        expected = read_expected(asm_path)
+        words, hex_lines, errors = assemble_file(asm_path)
+        if errors:
+            result["errors"] = errors
+            return result
+
+        key = result_key(_backend, words, digest=_digest) if _cache else None
+        trace = _cache.get(key) if key else None
+        result["cached"] = trace is not None
+        if trace is None:
+            if _backend == "icarus":
+                hex_path = os.path.join(_workspace, "program.hex")
+                write_memhex(hex_lines, hex_path)
+                lines = _session.run(hex_path, os.path.join(_workspace, "injections.hex"))
+            else:
+                lines = run_program(words)
+            trace = Trace.from_lines(lines)
+            if key:
+                _cache.put(key, trace)
+
+        ram, instructions = trace_state(trace)
+        result["ram"] = "".join(f"{v:X}" for v in ram)
+        result["instructions"] = instructions
+        result["cycles"] = cycle_count(instructions)
+
+        if expected is None:
+            result["status"] = "no-expect"
+        else:
+            result["mismatch"] = [a for a, v in enumerate(expected) if v is not None and ram[a] != v]
+            result["status"] = "fail" if result["mismatch"] else "pass"
+    except Exception as e:
+        result["errors"].append(str(e))
+    finally:
+        result["seconds"] = round(time.perf_counter() - t0, 6)
+    return result
+
+# ------------------------------------------------------------
+# Pool driver
+# ------------------------------------------------------------
+def run_all(paths, backend="icarus", jobs=None, rebuild=False, cache_dir=CACHE_DIR):
+    """
+    Runs every path across a process pool; returns the result records
+    in input order. cache_dir=None disables the result cache.
+    """
+    sim_exe = compile_sim(force=rebuild) if backend == "icarus" else None
+    digest = rtl_digest(backend) if cache_dir else None
+    jobs = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with tempfile.TemporaryDirectory(prefix="cpu_run_") as root_dir, \
+         ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(backend, sim_exe, root_dir, cache_dir, digest)) as pool:
+        return list(pool.map(run_job, paths, chunksize=chunksize))
+
+def summarize(results, seconds):
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return {
+        "jobs": len(results),
+        "counts": counts,
+        "instructions": sum(r["instructions"] for r in results),
+        "cycles": sum(r["cycles"] for r in results),
+        "cached": sum(r["cached"] for r in results),
+        "seconds": round(seconds, 3),
+    }
+
+# ------------------------------------------------------------
+# CLI Main entry
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many assembly files in parallel")
+    parser.add_argument("sources", nargs="+", help="directories, globs or .asm files")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("-o", "--output", default="results.json", help="consolidated results file")
+    parser.add_argument("--backend", choices=("icarus", "python"), default="icarus",
+                        help="bridge_tb under vvp, or the Python emulator")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the compile cache")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the simulation result cache")
+    opts = parser.parse_args()
+
+    paths = collect_sources(opts.sources)
+    if not paths:
+        print("No .asm files found.")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    try:
+        cache_dir = None if opts.no_cache or opts.rebuild else CACHE_DIR
+        results = run_all(paths, opts.backend, opts.jobs, opts.rebuild, cache_dir)
+    except subprocess.CalledProcessError as e:
+        print(e.stderr.decode() if e.stderr else str(e))
+        sys.exit(1)
+    except FileNotFoundError:
+        print("Icarus Verilog (iverilog/vvp) not found in PATH.")
+        sys.exit(1)
+    summary = summarize(results, time.perf_counter() - t0)
+
+    for r in results:
+        detail = r["ram"] or "; ".join(r["errors"])
+        if r["mismatch"]:
+            detail += "  mismatch @ " + ",".join(f"{a:X}" for a in r["mismatch"])
+        print(f"[{r['status'].upper():>9}] {r['file']}  {detail}")
+
+    with open(opts.output, "w") as f:
+        json.dump({"summary": summary, "results": results}, f, indent=1)
+
+    print(f"{summary['jobs']} jobs in {summary['seconds']} s "
+          f"({summary['jobs'] / max(summary['seconds'], 1e-9):.1f} jobs/s, {summary['cached']} cached): "
+          + ", ".join(f"{k} {v}" for k, v in sorted(summary["counts"].items())))
+    print(f"Results written to '{opts.output}'")
+    sys.exit(1 if any(r["status"] in ("fail", "error") for r in results) else 0)
+
+__all__ = [
+    "collect_sources",
+    "read_expected",
+    "final_state",
+    "trace_state",
+    "cycle_count",
+    "run_job",
+    "run_all",
+]
+
+if __name__ == "__main__":
+    main()
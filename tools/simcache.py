@@ -0,0 +1,211 @@
+# ============================================================
+# 4-bit CPU Simulation Result Cache
+# ------------------------------------------------------------
+# Memoizes parsed traces (tracestore.Trace) of finished runs,
+# keyed on everything that determines the output:
+#
+#   backend       "icarus" or "python"
+#   RTL digest    simulator.source_hash() (icarus) or the
+#                 emulator.py source (python)
+#   words         assembled instruction words (assemble_text)
+#   injections    (pc, addr, val) list, in order
+#
+# Two tiers:
+#   memory : LRU of the last MEMORY_ENTRIES traces
+#   disk   : one <key>.trc per entry in CACHE_DIR, bounded to
+#            DISK_MAX_BYTES; least recently used files go first
+#
+# Traces are copied in and out, so callers may truncate or
+# extend what they get back without touching the cache.
+#
+# Usage:
+#   python3 simcache.py            (disk tier statistics)
+#   python3 simcache.py --clear    (empty the disk tier)
+# ============================================================
+
+import os
+import sys
+import hashlib
+from array import array
+from collections import OrderedDict
+
+from tracestore import Trace
+from simulator import source_hash, SOURCES, INCLUDE_DIR, TOOLS_DIR
+
+# ------------------------------------------------------------
+# CONSTANTS
+# ------------------------------------------------------------
+CACHE_DIR = os.path.join(TOOLS_DIR, ".simcache")
+MEMORY_ENTRIES = 32
+DISK_MAX_BYTES = 64 << 20
+TRACE_SUFFIX = ".trc"
+
+# ------------------------------------------------------------
+# RTL digest (re-hashed only when a source file's stat changes)
+# ------------------------------------------------------------
+_digests = {}   # backend -> (stat signature, digest)
+
+def _rtl_files(backend):
+    if backend == "python":
+        return [os.path.join(TOOLS_DIR, "emulator.py")]
+    inc = os.path.normpath(os.path.join(TOOLS_DIR, INCLUDE_DIR))
+    files = [os.path.normpath(os.path.join(TOOLS_DIR, s)) for s in SOURCES]
+    return files + [os.path.join(inc, name) for name in sorted(os.listdir(inc))]
+
+def rtl_digest(backend):
+    """Digest of what produces the output for `backend` (cached on mtime/size)"""
+    files = _rtl_files(backend)
+    signature = tuple((st.st_mtime_ns, st.st_size) for st in map(os.stat, files))
+    cached = _digests.get(backend)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    if backend == "python":
+        with open(files[0], "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    else:
+        digest = source_hash()
+    _digests[backend] = (signature, digest)
+    return digest
+
+def result_key(backend, words, injections=(), digest=None):
+    """Cache key for one run (hex SHA-256)"""
+    h = hashlib.sha256()
+    h.update(backend.encode())
+    h.update((digest or rtl_digest(backend)).encode())
+    h.update(array("H", words).tobytes())
+    h.update(repr([tuple(inj) for inj in injections]).encode())
+    return h.hexdigest()
+
+# ------------------------------------------------------------
+# Two-tier cache
+# ------------------------------------------------------------
+class ResultCache:
+    def __init__(self, directory=CACHE_DIR, memory_entries=MEMORY_ENTRIES, max_bytes=DISK_MAX_BYTES):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()   # key -> Trace, most recent last
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    def _file(self, key):
+        return os.path.join(self.directory, key + TRACE_SUFFIX)
+
+    def _remember(self, key, trace):
+        self.memory[key] = trace
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """Copy of the cached trace for key, or None"""
+        trace = self.memory.get(key)
+        if trace is not None:
+            self.memory.move_to_end(key)
+            self.hits["memory"] += 1
+            return trace.copy()
+
+        if self.directory is not None:
+            path = self._file(key)
+            try:
+                trace = Trace.load(path)
+                os.utime(path)   # Disk LRU order is the file mtime
+            except (OSError, ValueError):
+                trace = None
+            if trace is not None:
+                self._remember(key, trace)
+                self.hits["disk"] += 1
+                return trace.copy()
+
+        self.misses += 1
+        return None
+
+    def put(self, key, trace):
+        """Stores a copy of a complete trace in both tiers"""
+        trace = trace.copy()
+        self._remember(key, trace)
+        if self.directory is None or self.max_bytes <= 0:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._file(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            trace.save(tmp)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self.evict()
+
+    def entries(self):
+        """[(mtime, size, path)] of the disk tier, oldest first"""
+        if self.directory is None or not os.path.isdir(self.directory):
+            return []
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(TRACE_SUFFIX):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue   # Evicted by another process
+                files.append((st.st_mtime_ns, st.st_size, entry.path))
+        return sorted(files)
+
+    def evict(self):
+        """Removes least recently used files until the disk tier fits max_bytes"""
+        files = self.entries()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        self.memory.clear()
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        files = self.entries()
+        return {
+            "memory_entries": len(self.memory),
+            "disk_entries": len(files),
+            "disk_bytes": sum(size for _, size, _ in files),
+            "hits": dict(self.hits),
+            "misses": self.misses,
+        }
+
+# ------------------------------------------------------------
+# CLI Main entry
+# ------------------------------------------------------------
+def main():
+    cache = ResultCache()
+    if sys.argv[1:] == ["--clear"]:
+        cache.clear()
+        print(f"Cleared '{cache.directory}'")
+        return
+    if sys.argv[1:]:
+        print("Usage: python3 simcache.py [--clear]")
+        sys.exit(1)
+    stats = cache.stats()
+    print(f"{stats['disk_entries']} traces, {stats['disk_bytes']} bytes in '{cache.directory}' "
+          f"(limit {cache.max_bytes} bytes)")
+
+__all__ = [
+    "ResultCache",
+    "result_key",
+    "rtl_digest",
+]
+
+if __name__ == "__main__":
+    main()
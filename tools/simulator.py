@@ -0,0 +1,293 @@
+# ============================================================
+# 4-bit CPU Icarus Verilog Backend
+# ------------------------------------------------------------
+# Builds testbench/bridge_tb.v + src/*.v into the `cpu_sim`
+# vvp image and runs it. The build is cached: cpu_sim is only
+# recompiled when the source list, include dir or RTL/testbench
+# contents change (hash stored in cpu_sim.hash).
+#
+# SimSession keeps one `vvp cpu_sim +server` process resident
+# and feeds it jobs over stdin, so process startup and RTL
+# elaboration are paid once instead of per run.
+#
+# Usage:
+#   python3 simulator.py            (build if needed + run)
+#   python3 simulator.py --rebuild  (force recompile)
+#   python3 simulator.py a.asm b.asm  (run each in one warm session)
+#   python3 simulator.py a.bin        (packed images run as-is)
+#   python3 simulator.py --dump --dump-scope alu   (write simulation.vcd)
+#
+# Waveform dumping is off unless +dump plusargs are passed
+# (see dump_plusargs and bridge_tb.v).
+# ============================================================
+
+import os
+import sys
+import glob
+import hashlib
+import argparse
+import tempfile
+import subprocess
+
+from assembler import assemble_file, write_memhex, is_image
+
+# ------------------------------------------------------------
+# PATHS (relative to tools/, like the GUI)
+# ------------------------------------------------------------
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SOURCES = [
+    "../testbench/bridge_tb.v",                # Local testbench
+    "../src/cpu_top.v",
+    "../src/decoder_fsm.v",
+    "../src/ram16x4.v",
+    "../src/reg_alu4.v",
+    "../src/full_adder4.v",
+    "../src/full_adder1.v",
+    "../src/xor_gate.v"
+]
+INCLUDE_DIR = "../src"
+SIM_EXE = "cpu_sim"
+HASH_SUFFIX = ".hash"
+INJ_DEPTH = 4096   # bridge_tb: reg [39:0] inj_mem [0:INJ_DEPTH-1]
+
+def _path(rel):
+    return os.path.normpath(os.path.join(TOOLS_DIR, rel))
+
+# ------------------------------------------------------------
+# Compile cache
+# ------------------------------------------------------------
+def source_hash():
+    """SHA-256 over the source list, include dir and RTL/testbench contents"""
+    h = hashlib.sha256()
+    h.update(repr(SOURCES).encode())
+    h.update(INCLUDE_DIR.encode())
+
+    inc = _path(INCLUDE_DIR)
+    files = sorted(glob.glob(os.path.join(inc, "*.v")))
+    files.append(os.path.join(inc, "cpu_defs.vh"))
+    files.append(_path("../testbench/bridge_tb.v"))
+
+    for path in files:
+        h.update(os.path.relpath(path, TOOLS_DIR).encode())
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def compile_sim(force=False, log=print):
+    """
+    Returns the path of an up-to-date cpu_sim, recompiling with
+    iverilog only on a cache miss (or when `force` is set).
+    Raises subprocess.CalledProcessError / FileNotFoundError like subprocess.run.
+    """
+    sim_exe = _path(SIM_EXE)
+    stamp = sim_exe + HASH_SUFFIX
+    digest = source_hash()
+
+    if not force and os.path.exists(sim_exe) and os.path.exists(stamp):
+        with open(stamp, "r") as f:
+            if f.read().strip() == digest:
+                log(f"[CACHE] HIT  {SIM_EXE} ({digest[:12]})")
+                return sim_exe
+
+    log(f"[CACHE] {'REBUILD' if force else 'MISS'} {SIM_EXE} ({digest[:12]}), compiling...")
+    if os.path.exists(stamp):
+        os.remove(stamp)
+
+    cmd_compile = ["iverilog", "-o", sim_exe, "-I", _path(INCLUDE_DIR)] + [_path(s) for s in SOURCES]
+    subprocess.run(cmd_compile, check=True, capture_output=True)
+
+    with open(stamp, "w") as f:
+        f.write(digest + "\n")
+    return sim_exe
+
+DUMP_SCOPES = ("tb", "cpu", "decoder", "alu", "ram")
+
+def dump_plusargs(scope="tb", depth=0, start=None, stop=None, path=None):
+    """bridge_tb plusargs that enable a VCD dump of `scope` (times in ns)"""
+    if scope not in DUMP_SCOPES:
+        raise ValueError(f"Unknown dump scope '{scope}' (expected one of {', '.join(DUMP_SCOPES)})")
+    plusargs = ["+dump", f"+dump_scope={scope}", f"+dump_depth={depth}"]
+    if start is not None:
+        plusargs.append(f"+dump_start={start}")
+    if stop is not None:
+        plusargs.append(f"+dump_stop={stop}")
+    if path is not None:
+        plusargs.append(f"+dump_file={path}")
+    return plusargs
+
+def run_sim(sim_exe, log_file="simulation.log", plusargs=()):
+    """Runs the vvp image in the current directory, writing stdout to log_file"""
+    with open(log_file, "w") as outfile:
+        subprocess.run(["vvp", sim_exe, *plusargs], stdout=outfile, check=True)
+
+# ------------------------------------------------------------
+# Injection schedule (read once per run by bridge_tb)
+# ------------------------------------------------------------
+def write_injections(injections, path="injections.hex"):
+    """
+    Writes (pc, addr, val) tuples as the $readmemh table bridge_tb
+    preloads: {pc[31:0], addr[3:0], val[3:0]} per line, sorted by pc
+    (entries for the same pc keep their order).
+    """
+    if len(injections) > INJ_DEPTH:
+        raise ValueError(f"Too many injections ({len(injections)} > {INJ_DEPTH})")
+    with open(path, "w") as f:
+        for step, addr, val in sorted(injections, key=lambda inj: inj[0]):
+            f.write(f"{step:08x}{addr & 0xF:x}{val & 0xF:x}\n")
+
+# ------------------------------------------------------------
+# Warm simulator session (bridge_tb +server mode)
+# ------------------------------------------------------------
+class SimSession:
+    def __init__(self, sim_exe, cwd=None):
+        self.sim_exe = sim_exe
+        self.cwd = cwd
+        self.proc = None
+        self.mtime = None
+
+    def start(self):
+        """Launches vvp once; RTL elaboration happens here"""
+        self.mtime = os.path.getmtime(self.sim_exe)
+        self.proc = subprocess.Popen(
+            ["vvp", self.sim_exe, "+server"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            cwd=self.cwd, text=True, bufsize=1,
+        )
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def is_stale(self):
+        """True if cpu_sim was rebuilt since this session started"""
+        return not os.path.exists(self.sim_exe) or os.path.getmtime(self.sim_exe) != self.mtime
+
+    def run(self, prog_path, inj_path="injections.hex"):
+        """Submits one job and returns its output lines up to and including [DONE]"""
+        return list(self.stream(prog_path, inj_path))
+
+    def stream(self, prog_path, inj_path="injections.hex"):
+        """
+        Submits one job and yields its output lines as vvp prints them
+        (bridge_tb flushes every FLUSH_EVERY instructions), up to and
+        including [DONE]. Must be consumed to the end.
+        `prog_path` may be a $readmemh file or a packed program image.
+        """
+        prog_path = os.path.abspath(prog_path)
+        inj_path = os.path.abspath(inj_path)
+        for path in (prog_path, inj_path):
+            if any(c.isspace() for c in path):
+                raise ValueError(f"Simulator session paths cannot contain whitespace: {path}")
+
+        if not self.alive():
+            self.start()
+
+        cmd = "RUNBIN" if is_image(prog_path) else "RUN"
+        self.proc.stdin.write(f"{cmd} {prog_path} {inj_path}\n")
+        self.proc.stdin.flush()
+
+        for line in self.proc.stdout:
+            line = line.rstrip("\n")
+            yield line
+            if line.startswith("[DONE]"):
+                return
+
+        self.close()
+        raise RuntimeError("vvp session exited before [DONE]")
+
+    def kill(self):
+        """Aborts the running job (e.g. a runaway program); the next job restarts vvp"""
+        proc = self.proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+
+    def close(self):
+        if self.proc is None:
+            return
+        try:
+            if self.proc.poll() is None:
+                self.proc.stdin.write("QUIT\n")
+                self.proc.stdin.close()
+                self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+        for pipe in (self.proc.stdin, self.proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        self.proc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ------------------------------------------------------------
+# CLI Main entry
+# ------------------------------------------------------------
+def run_batch_files(sim_exe, asm_paths):
+    """Assembles each file (program images are used directly) and runs it in one warm session"""
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp, SimSession(sim_exe, cwd=tmp) as session:
+        hex_path = os.path.join(tmp, "program.hex")
+        inj_path = os.path.join(tmp, "injections.hex")
+        for asm_path in asm_paths:
+            print(f"=== {asm_path} ===")
+            if is_image(asm_path):
+                for line in session.run(asm_path, inj_path):
+                    print(line)
+                continue
+            words, hex_lines, errors = assemble_file(asm_path)
+            if errors:
+                for e in errors:
+                    print(f"[ASM ERROR] {e}")
+                failed += 1
+                continue
+            write_memhex(hex_lines, hex_path)
+            for line in session.run(hex_path, inj_path):
+                print(line)
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Build (cached) and run the bridge_tb simulation")
+    parser.add_argument("programs", nargs="*", help="assembly files or program images to run in one warm session")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the compile cache")
+    parser.add_argument("--no-run", action="store_true", help="only build cpu_sim")
+    parser.add_argument("--dump", action="store_true", help="write simulation.vcd")
+    parser.add_argument("--dump-scope", choices=DUMP_SCOPES, default="tb", help="hierarchy to dump")
+    parser.add_argument("--dump-depth", type=int, default=0, help="levels below the scope (0 = all)")
+    parser.add_argument("--dump-start", type=int, default=None, help="start dumping at this time (ns)")
+    parser.add_argument("--dump-stop", type=int, default=None, help="stop dumping at this time (ns)")
+    opts = parser.parse_args()
+
+    try:
+        sim_exe = compile_sim(force=opts.rebuild)
+        if opts.programs:
+            sys.exit(1 if run_batch_files(sim_exe, opts.programs) else 0)
+        if not opts.no_run:
+            plusargs = []
+            if opts.dump:
+                plusargs = dump_plusargs(opts.dump_scope, opts.dump_depth, opts.dump_start, opts.dump_stop)
+            run_sim(sim_exe, plusargs=plusargs)
+            print("Simulation written to simulation.log" + (" (+ simulation.vcd)" if opts.dump else ""))
+    except subprocess.CalledProcessError as e:
+        print(e.stderr.decode() if e.stderr else str(e))
+        sys.exit(1)
+    except FileNotFoundError:
+        print("Icarus Verilog (iverilog/vvp) not found in PATH.")
+        sys.exit(1)
+
+__all__ = [
+    "SOURCES",
+    "source_hash",
+    "compile_sim",
+    "run_sim",
+    "dump_plusargs",
+    "SimSession",
+    "write_injections",
+]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# ============================================================
+# 4-bit CPU Execution Trace Store
+# ------------------------------------------------------------
+# Columnar (struct-of-arrays) store for the simulator event
+# stream, using the stdlib `array` module. Every event is one
+# row across five typed columns:
+#
+#   kind : EV_EXEC / EV_RAM / EV_INJECT / EV_DONE   (uint8)
+#   pc   : instruction index the event belongs to    (uint32)
+#   op   : opcode (EXEC rows)                        (uint8)
+#   addr : EXEC dest / RAM + INJECT address          (uint8)
+#   val  : EXEC src  / RAM + INJECT value            (uint8)
+#
+# Binary format (.trc, little-endian):
+#   header  "CPUTRACE" | u32 version | u32 count
+#   columns pc[count] (u32), kind[count], op[count],
+#           addr[count], val[count] (u8 each)
+# Trace.load(path, mmap=True) maps the file without copying.
+#
+# RamTimeline answers "RAM after rows [0, k)" for any k from a
+# full snapshot every SNAPSHOT_EVERY steps plus the RAM/INJECT
+# rows (the per-step deltas) after it.
+#
+# Usage:
+#   python3 tracestore.py simulation.log out.trc   (convert log)
+#   python3 tracestore.py out.trc                  (dump events)
+# ============================================================
+
+import sys
+import mmap as _mmap
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+# ------------------------------------------------------------
+# Event kinds / opcode names
+# ------------------------------------------------------------
+EV_EXEC   = 0
+EV_RAM    = 1
+EV_INJECT = 2
+EV_DONE   = 3
+
+EV_NAMES = ["EXEC", "RAM", "INJECT", "DONE"]
+
+# Index == opcode (3'b111 reserved, printed as ??? by bridge_tb)
+OP_NAMES = ["STO", "ADD", "SUB", "AND", "OR", "XOR", "NOT", "???"]
+
+MAGIC = b"CPUTRACE"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+
+SNAPSHOT_EVERY = 64   # Steps (EXEC rows) between full RAM snapshots
+
+# ------------------------------------------------------------
+# Event parser (bridge_tb / emulator output -> trace row)
+# ------------------------------------------------------------
+def parse_event(line):
+    """
+    Parses one simulator output line into a (kind, pc, op, addr, val)
+    row, or None for other output. pc is -1 when the line carries
+    none; Trace.append fills it from the preceding EXEC.
+    """
+    line = line.strip()
+
+    # Format: [EXEC] PC:0 | Op:STO | Dest:7 | Src:2
+    if line.startswith("[EXEC]"):
+        parts = line.split("|")
+        op = parts[1].split(":")[1].strip()
+        return (EV_EXEC,
+                int(parts[0].split(":")[1]),
+                OP_NAMES.index(op) if op in OP_NAMES else 7,
+                int(parts[2].split(":")[1], 16),
+                int(parts[3].split(":")[1], 16))
+
+    # Format: [RAM] Addr:7 Val:2
+    if line.startswith("[RAM]"):
+        parts = line.split()
+        return (EV_RAM, -1, 0,
+                int(parts[1].split(":")[1], 16),
+                int(parts[2].split(":")[1], 16))
+
+    # Format: [INJECT] Step:3 RAM[00000007]=0000000a
+    if line.startswith("[INJECT]"):
+        parts = line.split()
+        addr, val = parts[2][len("RAM["):].split("]=")
+        return (EV_INJECT,
+                int(parts[1].split(":")[1]), 0,
+                int(addr, 16) & 0xF,
+                int(val, 16) & 0xF)
+
+    if line.startswith("[DONE]"):
+        return (EV_DONE, -1, 0, 0, 0)
+
+    return None
+
+# ------------------------------------------------------------
+# Trace store
+# ------------------------------------------------------------
+class Trace:
+    def __init__(self):
+        self.pc   = array("I")
+        self.kind = array("B")
+        self.op   = array("B")
+        self.addr = array("B")
+        self.val  = array("B")
+        self.exec_rows = array("I")   # exec_rows[pc] = row index of that EXEC
+        self.last_pc = 0
+        self._map = None   # mmap backing a loaded trace (read-only)
+        self._view = None
+
+    def __len__(self):
+        return len(self.kind)
+
+    def append(self, kind, pc, op=0, addr=0, val=0):
+        """Adds one event row; pc < 0 means 'same instruction as the last EXEC'"""
+        if pc < 0:
+            pc = self.last_pc
+        elif kind == EV_EXEC:
+            self.last_pc = pc
+            self.exec_rows.append(len(self.kind))
+        self.pc.append(pc)
+        self.kind.append(kind)
+        self.op.append(op)
+        self.addr.append(addr)
+        self.val.append(val)
+
+    def append_line(self, line):
+        """Parses and appends one simulator output line; returns the row or None"""
+        row = parse_event(line)
+        if row is not None:
+            self.append(*row)
+        return row
+
+    def extend(self, other):
+        """Appends every row of another trace (e.g. a chunk parsed on another thread)"""
+        base = len(self)
+        for name in ("pc", "kind", "op", "addr", "val"):
+            getattr(self, name).extend(getattr(other, name))
+        self.exec_rows.extend(row + base for row in other.exec_rows)
+        if len(other):
+            self.last_pc = other.last_pc
+
+    @classmethod
+    def from_lines(cls, lines):
+        trace = cls()
+        for line in lines:
+            trace.append_line(line)
+        return trace
+
+    def copy(self):
+        """Independent in-memory copy (also of a trace loaded with mmap=True)"""
+        trace = Trace()
+        for name in ("pc", "kind", "op", "addr", "val"):
+            getattr(trace, name).frombytes(bytes(getattr(self, name)))
+        trace.exec_rows = array("I", self.exec_rows)
+        trace.last_pc = self.last_pc
+        return trace
+
+    def truncate(self, n):
+        """Drops every row from index n on (used to re-simulate a suffix)"""
+        for col in (self.pc, self.kind, self.op, self.addr, self.val):
+            del col[n:]
+        while self.exec_rows and self.exec_rows[-1] >= n:
+            self.exec_rows.pop()
+        self.last_pc = self.pc[n - 1] if n else 0
+
+    def row(self, i):
+        return self.kind[i], self.pc[i], self.op[i], self.addr[i], self.val[i]
+
+    def format_row(self, i):
+        """Human-readable event (same fields as the simulator line)"""
+        kind, pc, op, addr, val = self.row(i)
+        if kind == EV_EXEC:
+            return f"[EXEC] PC:{pc} | Op:{OP_NAMES[op]} | Dest:{addr:x} | Src:{val:x}"
+        if kind == EV_RAM:
+            return f"[RAM] Addr:{addr:x} Val:{val:x}"
+        if kind == EV_INJECT:
+            return f"[INJECT] Step:{pc} RAM[{addr:x}]={val:x}"
+        return "[DONE]"
+
+    # --------------------------------------------------------
+    # Binary save / load
+    # --------------------------------------------------------
+    def save(self, path):
+        pc = self.pc
+        if sys.byteorder != "little":
+            pc = array("I", pc)
+            pc.byteswap()
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self)))
+            for col in (pc, self.kind, self.op, self.addr, self.val):
+                col.tofile(f)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """
+        Loads a .trc file. With mmap=True the columns are read-only
+        memoryviews over the mapped file (no copy); call close() when done.
+        """
+        trace = cls()
+        with open(path, "rb") as f:
+            magic, version, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Not a v{VERSION} trace file: {path}")
+
+            if mmap and sys.byteorder == "little" and count:
+                trace._map = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+                mv = trace._view = memoryview(trace._map)
+                off = HEADER.size
+                trace.pc = mv[off:off + 4 * count].cast("I")
+                off += 4 * count
+                for name in ("kind", "op", "addr", "val"):
+                    setattr(trace, name, mv[off:off + count])
+                    off += count
+            else:
+                trace.pc.fromfile(f, count)
+                if sys.byteorder != "little":
+                    trace.pc.byteswap()
+                for col in (trace.kind, trace.op, trace.addr, trace.val):
+                    col.fromfile(f, count)
+
+        if count:
+            trace.last_pc = trace.pc[count - 1]
+        trace.exec_rows = array("I", (i for i in range(count) if trace.kind[i] == EV_EXEC))
+        return trace
+
+    def close(self):
+        """Releases the mapping of a trace loaded with mmap=True"""
+        if self._map is None:
+            return
+        for name, typecode in (("pc", "I"), ("kind", "B"), ("op", "B"), ("addr", "B"), ("val", "B")):
+            getattr(self, name).release()
+            setattr(self, name, array(typecode))
+        self._view.release()
+        self._view = None
+        self._map.close()
+        self._map = None
+
+# ------------------------------------------------------------
+# Checkpoint index (RAM at any position in O(SNAPSHOT_EVERY))
+# ------------------------------------------------------------
+class RamTimeline:
+    def __init__(self, trace, every=SNAPSHOT_EVERY):
+        self.trace = trace
+        self.every = every
+        self.snap_rows = array("I")   # Row of the EXEC each snapshot precedes
+        self.snaps = []               # bytes(16): RAM before that row
+        self.mem = [0] * 16           # RAM after rows [0, scanned)
+        self.scanned = 0
+        self.steps = 0
+
+    def update(self):
+        """Indexes rows appended to the trace since the last call"""
+        t = self.trace
+        for i in range(self.scanned, len(t)):
+            kind = t.kind[i]
+            if kind == EV_EXEC:
+                if self.steps % self.every == 0:
+                    self.snap_rows.append(i)
+                    self.snaps.append(bytes(self.mem))
+                self.steps += 1
+            elif kind == EV_RAM or kind == EV_INJECT:
+                self.mem[t.addr[i]] = t.val[i]
+        self.scanned = len(t)
+
+    def truncate(self, n):
+        """Forgets rows from n on (after Trace.truncate(n)); rescans from the last snapshot"""
+        j = bisect_left(self.snap_rows, n)
+        if j == 0:
+            self.mem, self.scanned, self.steps = [0] * 16, 0, 0
+        else:
+            j -= 1
+            self.mem, self.scanned, self.steps = list(self.snaps[j]), self.snap_rows[j], j * self.every
+        del self.snap_rows[j:]
+        del self.snaps[j:]
+
+    def ram_at(self, k):
+        """RAM image (list of 16) after trace rows [0, k)"""
+        self.update()
+        j = bisect_right(self.snap_rows, k) - 1
+        if j < 0:
+            mem, start = [0] * 16, 0
+        else:
+            mem, start = list(self.snaps[j]), self.snap_rows[j]
+        t = self.trace
+        for i in range(start, k):
+            kind = t.kind[i]
+            if kind == EV_RAM or kind == EV_INJECT:
+                mem[t.addr[i]] = t.val[i]
+        return mem
+
+    def step_count(self):
+        return len(self.trace.exec_rows)
+
+    def steps_before(self, k):
+        """Number of instructions started before row k"""
+        return bisect_left(self.trace.exec_rows, k)
+
+    def step_row(self, d):
+        """Row position after d instructions (their RAM rows included)"""
+        rows = self.trace.exec_rows
+        return rows[d] if d < len(rows) else len(self.trace)
+
+# ------------------------------------------------------------
+# CLI Main entry
+# ------------------------------------------------------------
+def main():
+    if len(sys.argv) == 3:
+        with open(sys.argv[1], "r") as f:
+            trace = Trace.from_lines(f)
+        trace.save(sys.argv[2])
+        print(f"Wrote {len(trace)} events to '{sys.argv[2]}'")
+    elif len(sys.argv) == 2:
+        trace = Trace.load(sys.argv[1], mmap=True)
+        for i in range(len(trace)):
+            print(trace.format_row(i))
+        trace.close()
+    else:
+        print("Usage: python3 tracestore.py <simulation.log> <out.trc> | <trace.trc>")
+        sys.exit(1)
+
+__all__ = [
+    "EV_EXEC", "EV_RAM", "EV_INJECT", "EV_DONE",
+    "OP_NAMES",
+    "Trace",
+    "RamTimeline",
+    "parse_event",
+]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# ============================================================
+# 4-bit CPU VCD Index
+# ------------------------------------------------------------
+# Streaming reader for simulation.vcd. One pass over the file
+# builds, per signal, time-sorted change arrays:
+#
+#   times  : change times                  array("Q")
+#   values : index into the signal's value table  array("I")
+#
+# plus a seek point every SEEK_EVERY bytes (time, file offset and
+# the value of every signal there). Signals left out of the index
+# (or every signal, for dumps above INDEX_ALL_MAX_BYTES) are
+# answered by seeking to the nearest point and scanning forward,
+# so memory stays bounded for multi-hundred-MB dumps.
+# index_signals(names) adds change arrays for more signals later
+# in one pass (the GUI runs it off the Tk thread).
+#
+# Queries:
+#   value_at(name, t)        value of a signal at time t
+#   changes(name, t0, t1)    [(time, value)] with t0 <= time <= t1
+#   window(names, t0, t1)    {name: (value at t0, changes)} in one pass
+#
+# Usage:
+#   python3 vcdindex.py simulation.vcd                 (list signals)
+#   python3 vcdindex.py simulation.vcd <signal> t0 t1  (dump changes)
+# ============================================================
+
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+# ------------------------------------------------------------
+# CONSTANTS
+# ------------------------------------------------------------
+SEEK_EVERY = 1 << 20              # bytes between seek points
+INDEX_ALL_MAX_BYTES = 64 << 20    # index every signal up to this file size
+
+# ------------------------------------------------------------
+# Per-identifier change store
+# ------------------------------------------------------------
+class Signal:
+    def __init__(self, code, width):
+        self.code = code
+        self.width = width
+        self.names = []
+        self.indexed = False
+        self.times = array("Q")
+        self.values = array("I")
+        self.table = []      # value id -> value string
+        self._ids = {}       # value string -> value id
+
+    def add(self, t, value):
+        vid = self._ids.get(value)
+        if vid is None:
+            vid = self._ids[value] = len(self.table)
+            self.table.append(value)
+        self.times.append(t)
+        self.values.append(vid)
+
+    def value_at(self, t):
+        i = bisect_right(self.times, t) - 1
+        return self.table[self.values[i]] if i >= 0 else None
+
+    def changes(self, t0, t1):
+        lo = bisect_left(self.times, t0)
+        hi = bisect_right(self.times, t1)
+        return [(self.times[i], self.table[self.values[i]]) for i in range(lo, hi)]
+
+# ------------------------------------------------------------
+# VCD body tokenizer: yields (None, time) / (code, value)
+# ------------------------------------------------------------
+def _body_events(tokens):
+    it = iter(tokens)
+    for tok in it:
+        c = tok[0]
+        if c == "#":
+            yield None, int(tok[1:])
+        elif c in "bBrR":
+            yield next(it), tok[1:]
+        elif c in "01xXzZ":
+            yield tok[1:], c.lower()
+        elif tok == "$comment":
+            for tok in it:
+                if tok == "$end":
+                    break
+        # $dumpvars / $dumpall / $dumpon / $dumpoff / $end: values follow as usual
+
+# ------------------------------------------------------------
+# Index
+# ------------------------------------------------------------
+class VCDIndex:
+    def __init__(self, path, signals=None, seek_every=SEEK_EVERY):
+        """
+        Indexes `path` in one streaming pass. `signals` is a list of
+        names to keep change arrays for (None: all of them, unless the
+        file is larger than INDEX_ALL_MAX_BYTES).
+        """
+        self.path = path
+        self.timescale = ""
+        self.signals = {}     # full name -> Signal
+        self.codes = {}       # id code -> Signal
+        self.end_time = 0
+        self.body_offset = 0  # File offset of the first line after $enddefinitions
+        self.seek_times = array("Q")
+        self.seek_offsets = array("Q")
+        self.seek_states = []  # {code: value} at each seek point
+        self._build(signals, seek_every)
+
+    # --------------------------------------------------------
+    def _build(self, wanted, seek_every):
+        if wanted is None and os.path.getsize(self.path) > INDEX_ALL_MAX_BYTES:
+            wanted = []
+        state = {}            # code -> current value
+        pos = 0
+        last_seek = -seek_every
+        scope = []
+        header = True
+        pending = []          # header tokens of the current $... $end block
+        t = 0
+
+        with open(self.path, "rb") as f:
+            for raw in f:
+                line_pos = pos
+                pos += len(raw)
+                tokens = raw.decode("ascii", "replace").split()
+                if not tokens:
+                    continue
+
+                if header:
+                    for tok in tokens:
+                        pending.append(tok)
+                        if tok == "$end":
+                            header = self._header_block(pending, scope)
+                            pending = []
+                    if not header:
+                        self.body_offset = pos
+                        self._select(wanted)
+                    continue
+
+                for code, value in _body_events(tokens):
+                    if code is None:
+                        t = value
+                        if line_pos - last_seek >= seek_every:
+                            self.seek_times.append(t)
+                            self.seek_offsets.append(line_pos)
+                            self.seek_states.append(dict(state))
+                            last_seek = line_pos
+                        continue
+                    sig = self.codes.get(code)
+                    if sig is None:
+                        continue
+                    state[code] = value
+                    if sig.indexed:
+                        sig.add(t, value)
+        self.end_time = t
+
+    def _header_block(self, block, scope):
+        """Handles one $keyword ... $end block; returns False after $enddefinitions"""
+        kind = block[0]
+        if kind == "$scope":
+            scope.append(block[2])
+        elif kind == "$upscope":
+            scope.pop()
+        elif kind == "$timescale":
+            self.timescale = "".join(block[1:-1])
+        elif kind == "$var":
+            width, code, ref = int(block[2]), block[3], block[4]
+            sig = self.codes.get(code)
+            if sig is None:
+                sig = self.codes[code] = Signal(code, width)
+            name = ".".join(scope + [ref])
+            sig.names.append(name)
+            self.signals[name] = sig
+        elif kind == "$enddefinitions":
+            return False
+        return True
+
+    def _select(self, wanted):
+        for name, sig in self.signals.items():
+            if wanted is None or name in wanted:
+                sig.indexed = True
+
+    def index_signals(self, names):
+        """
+        Builds change arrays for the named signals not indexed yet, in
+        one pass over the body. A Signal is marked indexed only once
+        complete, so other threads may keep querying meanwhile.
+        """
+        fresh = {}
+        for name in names:
+            sig = self.signals[name]
+            if not sig.indexed:
+                fresh[sig.code] = Signal(sig.code, sig.width)
+        if not fresh:
+            return
+
+        t = 0
+        with open(self.path, "rb") as f:
+            f.seek(self.body_offset)
+            for raw in f:
+                for code, value in _body_events(raw.decode("ascii", "replace").split()):
+                    if code is None:
+                        t = value
+                    else:
+                        sig = fresh.get(code)
+                        if sig is not None:
+                            sig.add(t, value)
+
+        for code, built in fresh.items():
+            sig = self.codes[code]
+            sig.times, sig.values, sig.table, sig._ids = built.times, built.values, built.table, built._ids
+            sig.indexed = True
+
+    # --------------------------------------------------------
+    def names(self):
+        return list(self.signals)
+
+    def _scan(self, codes, t0, t1):
+        """Seek + forward scan: ({code: value at t0}, {code: [(t, v)]}) for codes"""
+        k = bisect_right(self.seek_times, t0) - 1
+        if k >= 0:
+            offset, state = self.seek_offsets[k], self.seek_states[k]
+            start = {c: state.get(c) for c in codes}
+        else:
+            offset, start = 0, dict.fromkeys(codes)
+        changes = {c: [] for c in codes}
+
+        t = 0
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            body = offset > 0
+            for raw in f:
+                tokens = raw.decode("ascii", "replace").split()
+                if not body:
+                    body = "$enddefinitions" in tokens
+                    continue
+                for code, value in _body_events(tokens):
+                    if code is None:
+                        t = value
+                        if t > t1:
+                            return start, changes
+                    elif code in changes:
+                        if t < t0:
+                            start[code] = value
+                        else:
+                            changes[code].append((t, value))
+        return start, changes
+
+    def value_at(self, name, t):
+        sig = self.signals[name]
+        if sig.indexed:
+            return sig.value_at(t)
+        start, changes = self._scan([sig.code], t, t)
+        ch = changes[sig.code]
+        return ch[-1][1] if ch else start[sig.code]
+
+    def changes(self, name, t0, t1):
+        sig = self.signals[name]
+        if sig.indexed:
+            return sig.changes(t0, t1)
+        return self._scan([sig.code], t0, t1)[1][sig.code]
+
+    def window(self, names, t0, t1):
+        """{name: (value just before t0, [(t, v)] in [t0, t1])}, one file scan at most"""
+        result = {}
+        scan = []
+        for name in names:
+            sig = self.signals[name]
+            if sig.indexed:
+                result[name] = (sig.value_at(t0 - 1) if t0 > 0 else None, sig.changes(t0, t1))
+            else:
+                scan.append(name)
+        if scan:
+            start, changes = self._scan({self.signals[n].code for n in scan}, t0, t1)
+            for name in scan:
+                code = self.signals[name].code
+                result[name] = (start[code], changes[code])
+        return result
+
+# ------------------------------------------------------------
+# CLI Main entry
+# ------------------------------------------------------------
+def main():
+    if len(sys.argv) == 2:
+        idx = VCDIndex(sys.argv[1])
+        for name in idx.names():
+            sig = idx.signals[name]
+            print(f"{name:50s} width={sig.width:<3d} changes={len(sig.times)}")
+        print(f"end time {idx.end_time} ({idx.timescale}), {len(idx.seek_times)} seek points")
+    elif len(sys.argv) == 5:
+        idx = VCDIndex(sys.argv[1], signals=[sys.argv[2]])
+        t0, t1 = int(sys.argv[3]), int(sys.argv[4])
+        print(f"{sys.argv[2]} @ {t0} = {idx.value_at(sys.argv[2], t0)}")
+        for t, v in idx.changes(sys.argv[2], t0, t1):
+            print(f"  #{t}  {v}")
+    else:
+        print("Usage: python3 vcdindex.py <file.vcd> [<signal> <t0> <t1>]")
+        sys.exit(1)
+
+__all__ = [
+    "VCDIndex",
+    "Signal",
+]
+
+if __name__ == "__main__":
+    main()